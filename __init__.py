@@ -1,5 +1,17 @@
 from .grid_analytics import *
 # from .tools import *
-from .utilities import *
+from .utilities.color_value import *
+from .utilities.utilities import *
+from .utilities.mesh import *
+from .utilities.image import *
+from . import utilities as _utilities
 
-__all__ = [name for name in dir() if not name.startswith('_')]
+
+def __getattr__(name):
+    # display functions load matplotlib on first use
+    if name in _utilities._LAZY:
+        return getattr(_utilities, name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+__all__ = [name for name in dir() if not name.startswith('_')] + list(_utilities._LAZY)
@@ -0,0 +1,4 @@
+from .generators import *
+from .suite import *
+
+__all__ = [name for name in dir() if not name.startswith('_')]
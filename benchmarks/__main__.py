@@ -0,0 +1,62 @@
+"""
+Runs the benchmark suite
+
+    python -m grid_analytics.benchmarks --quick
+    python -m grid_analytics.benchmarks --save results.json
+    python -m grid_analytics.benchmarks --baseline --tolerance 0.25
+    python -m grid_analytics.benchmarks --baseline results.json
+
+Exits with 1 if a benchmark is slower or allocates more memory than the baseline allows.
+--baseline without a file compares with benchmarks/baseline.json, a full run of the suite
+(all sizes, so --quick runs compare as well) on a reference machine. Timings depend on the machine:
+regenerate it on the machine the comparisons run on, after intended performance changes, with
+a quiet machine (on shared or virtual machines sub-10 ms timings vary by up to 2x, raise --tolerance there),
+
+    python -m grid_analytics.benchmarks --save grid_analytics/benchmarks/baseline.json
+"""
+import os
+import sys
+import argparse
+from .suite import BENCHMARKS
+from .suite import run_suite
+from .suite import save_results
+from .suite import load_results
+from .suite import compare_results
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m grid_analytics.benchmarks', description='grid_analytics benchmarks')
+    parser.add_argument('names', nargs='*', help='benchmarks to run, all by default')
+    parser.add_argument('--quick', action='store_true', help='run the two smallest sizes only')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per size, the best is reported')
+    parser.add_argument('--save', help='write the results to a JSON file')
+    parser.add_argument('--baseline', nargs='?', const=BASELINE,
+                        help='compare with the results in a JSON file, benchmarks/baseline.json without a file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='accepted relative regression')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for benchmark in BENCHMARKS:
+            print('%-40s %s' % (benchmark.name, benchmark.sizes))
+        return 0
+
+    results = run_suite(args.names, args.quick, args.repeat)
+    if args.save:
+        save_results(results, args.save)
+
+    if args.baseline:
+        regressions = compare_results(results, load_results(args.baseline), args.tolerance)
+        for name, size, metric, reference, value in regressions:
+            print('REGRESSION %s size %s: %s %.6g -> %.6g' % (name, size, metric, reference, value))
+        if regressions:
+            return 1
+        print('no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
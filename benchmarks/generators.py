@@ -0,0 +1,88 @@
+import numpy as np
+
+
+__all__ = ['random_grid',
+           'rooms_grid',
+           'rooms_volume']
+
+
+def random_grid(shape, density=0.3, seed=0):
+    """
+    2D or 3D array with randomly placed solid cells
+
+    Parameters
+    ----------
+    shape : shape of the array
+    density : probability of a cell to be solid
+    seed : seed of the random generator
+
+    Returns
+    -------
+    int numpy array with 0 for void and 1 for solid cells
+    """
+    rng = np.random.default_rng(seed)
+    return (rng.random(shape) < density).astype(int)
+
+
+def rooms_grid(shape, room_size=8, door_width=2, seed=0):
+    """
+    2D floor plan of rectangular rooms on a regular grid, every wall has a door at a random position,
+    so all rooms are connected like corridors and rooms of a building
+
+    Parameters
+    ----------
+    shape : (rows, cols) of the plan
+    room_size : distance between the walls in cells
+    door_width : width of the doors in cells
+    seed : seed of the random generator
+
+    Returns
+    -------
+    int numpy array with 0 for void and 1 for solid cells
+    """
+    rng = np.random.default_rng(seed)
+    plan = np.zeros(shape, dtype=int)
+    rows, cols = shape
+    walls_x = np.arange(room_size, rows, room_size + 1)
+    walls_y = np.arange(room_size, cols, room_size + 1)
+    plan[walls_x, :] = 1
+    plan[:, walls_y] = 1
+
+    # a door in each wall segment between two wall crossings
+    bounds_x = np.concatenate(([-1], walls_x, [rows]))
+    bounds_y = np.concatenate(([-1], walls_y, [cols]))
+    for x in walls_x:
+        for y0, y1 in zip(bounds_y[:-1], bounds_y[1:]):
+            if y1 - y0 - 1 >= door_width:
+                door = rng.integers(y0 + 1, y1 - door_width + 1)
+                plan[x, door:door + door_width] = 0
+    for y in walls_y:
+        for x0, x1 in zip(bounds_x[:-1], bounds_x[1:]):
+            if x1 - x0 - 1 >= door_width:
+                door = rng.integers(x0 + 1, x1 - door_width + 1)
+                plan[door:door + door_width, y] = 0
+    return plan
+
+
+def rooms_volume(shape, room_size=8, floor_height=4, seed=0):
+    """
+    3D building of stacked floor plans (see rooms_grid) separated by solid slabs
+
+    Parameters
+    ----------
+    shape : (x, y, z) of the volume
+    room_size : distance between the walls in cells
+    floor_height : distance between the slabs in cells
+    seed : seed of the random generator
+
+    Returns
+    -------
+    int numpy array with 0 for void and 1 for solid cells
+    """
+    volume = np.zeros(shape, dtype=int)
+    for z in range(shape[2]):
+        if z % (floor_height + 1) == floor_height:
+            volume[:, :, z] = 1
+        else:
+            volume[:, :, z] = rooms_grid(shape[:2], room_size, seed=seed + z // (floor_height + 1))
+    return volume
@@ -0,0 +1,294 @@
+import gc
+import json
+import time
+import datetime
+import tracemalloc
+import numpy as np
+from .. import grid_analytics as ga
+from ..tools import Isovist
+from ..tools import Shortestpath
+from ..tools import HierarchicalPath
+from ..tools import sun_vectors
+from ..tools import disable_cache
+from .generators import random_grid
+from .generators import rooms_grid
+from .generators import rooms_volume
+
+
+__all__ = ['Benchmark',
+           'BENCHMARKS',
+           'run_benchmark',
+           'run_suite',
+           'scaling_exponent',
+           'save_results',
+           'load_results',
+           'compare_results']
+
+
+class Benchmark:
+    """ A timed call at several grid sizes
+
+    Attributes
+    ----------
+    name : name of the benchmark
+    setup : function taking a size and returning (the function to time without arguments, amount of cells)
+    sizes : grid sizes (side lengths) of the full run
+    quick_sizes : grid sizes of the quick run
+    """
+
+    def __init__(self, name, setup, sizes, quick_sizes=None):
+        self.name = name
+        self.setup = setup
+        self.sizes = sizes
+        self.quick_sizes = quick_sizes or sizes[:2]
+
+
+def _plan(n, seed=0):
+    return rooms_grid((n, n), seed=seed)
+
+
+def _volume(n, seed=0):
+    return rooms_volume((n, n, max(n // 2, 5)), seed=seed)
+
+
+def _free_cell(array):
+    """ first and last void cell """
+    cells = np.argwhere(array == 0)
+    return tuple(cells[0]), tuple(cells[-1])
+
+
+def _light_vectors():
+    return [np.array(v, dtype=float) for v in [(1, 0.5, -1), (-0.5, 1, -1), (0.2, -1, -0.8), (-1, -0.3, -1.5)]]
+
+
+def _bench(function, array, *args, **kwargs):
+    return (lambda: function(array, *args, **kwargs)), array.size
+
+
+def _shortestpath_bench(n):
+    array = _plan(n)
+    sp, ep = _free_cell(array)
+    start = np.ravel_multi_index(sp, array.shape)
+    end = np.ravel_multi_index(ep, array.shape)
+    return (lambda: ga.analyse_shortestpath2D(array, start, end)), array.size
+
+
+def _isovist2D_bench(n):
+    array = _plan(n)
+    view_point = _free_cell(array)[0][::-1]
+    return (lambda: ga.analyse_isovist2D(array, view_point=view_point)), array.size
+
+
+def _isovist3D_bench(n):
+    array = _volume(n)
+    return (lambda: ga.analyse_isovist3D(array, view_point=_free_cell(array)[0])), array.size
+
+
+def _isovist_map3D_bench(n):
+    array = _volume(n)
+    view_points = np.argwhere(array == 0)[::97]
+    return (lambda: ga.analyse_isovist_map3D(array, radius=n // 2, view_points=view_points)), array.size
+
+
+def _sun_hours_bench(n):
+    array = random_grid((n, n, n // 2), 0.05)
+    start = datetime.datetime(2021, 6, 21, 4)
+    end = datetime.datetime(2021, 6, 21, 22)
+    return (lambda: ga.analyse_sun_hours(array, 47.37, 8.54, start, end, datetime.timedelta(hours=1), 2)), array.size
+
+
+def _exposure_bench(n):
+    array = random_grid((n, n, n // 2), 0.05)
+    vectors, weights = sun_vectors(47.37, 8.54, datetime.datetime(2021, 6, 21, 4), datetime.datetime(2021, 6, 21, 22),
+                                   datetime.timedelta(hours=2), 2)
+    return (lambda: ga.analyse_exposure(array, vectors, weights)), array.size
+
+
+def _isovist_method_bench(n):
+    isovist = Isovist(_plan(n) * -1)
+    return (lambda: isovist.isovist_map(format=1)), isovist.obstacle_map.size
+
+
+def _spanningtree_bench(n):
+    shortest_path = Shortestpath(_plan(n) * -1, cache_size=0)
+    start = np.flatnonzero(shortest_path.obstacle_map.ravel() == 0)[0]
+    return (lambda: shortest_path.get_minimal_spanningtree(start)), shortest_path.obstacle_map.size
+
+
+def _spanningtree_cost_bench(n):
+    obstacle_map = _plan(n) * -1
+    cost_map = 1 + np.random.default_rng(0).random(obstacle_map.shape)
+    shortest_path = Shortestpath(obstacle_map, cache_size=0, cost_map=cost_map)
+    start = np.flatnonzero(obstacle_map.ravel() == 0)[0]
+    return (lambda: shortest_path.get_minimal_spanningtree(start)), obstacle_map.size
+
+
+def _traffic_bench(n):
+    shortest_path = Shortestpath(_plan(n) * -1, cache_size=0)
+    return (lambda: shortest_path.get_traffic(format=1)), shortest_path.obstacle_map.size
+
+
+def _sources(array, n=4):
+    """ n void cells spread over the array """
+    cells = np.argwhere(array == 0)
+    return cells[np.linspace(0, len(cells) - 1, n).astype(int)]
+
+
+def _catchment_bench(n):
+    array = _plan(n)
+    return (lambda: ga.analyse_catchment2D(array, _sources(array))), array.size
+
+
+def _any_angle_path_bench(n):
+    array = _plan(n)
+    sp, ep = _free_cell(array)
+    return (lambda: ga.analyse_any_angle_path2D(array, sp, ep)), array.size
+
+
+def _hierarchical_build_bench(n):
+    obstacle_map = _plan(n) * -1
+    return (lambda: HierarchicalPath(obstacle_map, cluster_size=16)), obstacle_map.size
+
+
+def _hierarchical_query_bench(n):
+    hierarchical_path = HierarchicalPath(_plan(n) * -1, cluster_size=16)
+    start, end = np.flatnonzero(hierarchical_path.obstacle_map.ravel() == 0)[[0, -1]]
+    return (lambda: hierarchical_path.find_path(start, end)), hierarchical_path.obstacle_map.size
+
+
+BENCHMARKS = [
+    Benchmark('analyse_neighbours2D', lambda n: _bench(ga.analyse_neighbours2D, random_grid((n, n))), [64, 128, 256, 512, 1024]),
+    Benchmark('analyse_neighbours3D', lambda n: _bench(ga.analyse_neighbours3D, random_grid((n, n, n))), [16, 32, 64, 128]),
+    Benchmark('analyse_facades', lambda n: _bench(ga.analyse_facades, random_grid((n, n, n))), [16, 32, 64, 128]),
+    Benchmark('analyse_isovist_map2D', lambda n: _bench(ga.analyse_isovist_map2D, _plan(n)), [16, 32, 48, 64]),
+    Benchmark('analyse_isovist_map2D_solid', lambda n: _bench(ga.analyse_isovist_map2D, _plan(n), mode='solid'), [16, 32, 48, 64]),
+    Benchmark('analyse_isovist2D', _isovist2D_bench, [64, 128, 256, 512]),
+    Benchmark('analyse_isovist3D', _isovist3D_bench, [16, 24, 32, 48]),
+    Benchmark('analyse_isovist_map3D', _isovist_map3D_bench, [16, 24, 32, 48]),
+    Benchmark('analyse_shortestpath2D', _shortestpath_bench, [16, 32, 64, 128]),
+    Benchmark('analyse_centrality2D', lambda n: _bench(ga.analyse_centrality2D, _plan(n)), [8, 12, 16, 24]),
+    Benchmark('analyse_shadow_bresenham', lambda n: _bench(ga.analyse_shadow, random_grid((n, n, n // 2), 0.05), _light_vectors()), [16, 32, 64]),
+    Benchmark('analyse_shadow_exact', lambda n: _bench(ga.analyse_shadow, random_grid((n, n, n // 2), 0.05), _light_vectors(), 'exact'), [16, 32, 64]),
+    Benchmark('analyse_shadow_traversal', lambda n: _bench(ga.analyse_shadow, random_grid((n, n, n // 2), 0.05), _light_vectors(), 'traversal'), [16, 32, 64, 128]),
+    Benchmark('analyse_sun_hours', _sun_hours_bench, [16, 32, 64]),
+    Benchmark('analyse_exposure', _exposure_bench, [16, 32, 64]),
+    Benchmark('analyse_distances2D', lambda n: _bench(ga.analyse_distances2D, random_grid((n, n), 0.05)), [32, 64, 128, 256]),
+    Benchmark('analyse_distances2D_3D', lambda n: _bench(ga.analyse_distances2D, random_grid((n, n, 8), 0.05)), [32, 64, 128]),
+    Benchmark('analyse_voronoi2D', lambda n: _bench(ga.analyse_voronoi2D, random_grid((n, n), 0.05)), [32, 64, 128, 256]),
+    Benchmark('Isovist.isovist_map', _isovist_method_bench, [16, 32, 48, 64]),
+    Benchmark('Shortestpath.get_minimal_spanningtree', _spanningtree_bench, [32, 64, 128, 256]),
+    Benchmark('Shortestpath.get_minimal_spanningtree_cost', _spanningtree_cost_bench, [32, 64, 128, 256]),
+    Benchmark('Shortestpath.get_traffic', _traffic_bench, [8, 12, 16, 24]),
+    Benchmark('analyse_catchment2D', _catchment_bench, [32, 64, 128, 256]),
+    Benchmark('analyse_geodesic2D', lambda n: _bench(ga.analyse_geodesic2D, _plan(n), (0, 0)), [64, 128, 256, 512]),
+    Benchmark('analyse_geodesic2D_any_angle', lambda n: _bench(ga.analyse_geodesic2D, _plan(n), (0, 0), method='any_angle'), [64, 128, 256]),
+    Benchmark('analyse_any_angle_path2D', _any_angle_path_bench, [64, 128, 256, 512]),
+    Benchmark('analyse_components', lambda n: _bench(ga.analyse_components, random_grid((n, n), 0.4)), [128, 256, 512, 1024]),
+    Benchmark('analyse_components_3D', lambda n: _bench(ga.analyse_components, random_grid((n, n, n), 0.6)), [16, 32, 64, 128]),
+    Benchmark('HierarchicalPath', _hierarchical_build_bench, [64, 128, 256]),
+    Benchmark('HierarchicalPath.find_path', _hierarchical_query_bench, [128, 256, 512, 1024]),
+]
+
+
+def run_benchmark(benchmark, size, repeat=3):
+    """
+    Times a benchmark at one size
+
+    Returns
+    -------
+    dict with the amount of cells, the best time in seconds and the peak memory allocated in bytes
+    """
+    function, cells = benchmark.setup(size)
+    # the first call compiles the numba kernels and fills lazy attributes
+    function()
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'cells': int(cells), 'seconds': min(times), 'peak_bytes': int(peak)}
+
+
+def scaling_exponent(results):
+    """
+    Exponent k of the fitted time ~ cells**k over the results of one benchmark
+    """
+    cells = [r['cells'] for r in results.values()]
+    seconds = [max(r['seconds'], 1e-9) for r in results.values()]
+    if len(cells) < 2:
+        return float('nan')
+    return float(np.polyfit(np.log(cells), np.log(seconds), 1)[0])
+
+
+def run_suite(names=None, quick=False, repeat=3, log=print):
+    """
+    Runs the benchmarks with the given names (all by default)
+
+    Returns
+    -------
+    dict {name: {'sizes': {size: result of run_benchmark}, 'exponent': float}}
+    """
+    disable_cache()
+    results = {}
+    for benchmark in BENCHMARKS:
+        if names and benchmark.name not in names:
+            continue
+        sizes = benchmark.quick_sizes if quick else benchmark.sizes
+        runs = {}
+        for size in sizes:
+            runs[str(size)] = run_benchmark(benchmark, size, repeat)
+            if log:
+                log('%-40s %6d %12.6f s %10.1f MB' % (benchmark.name, size, runs[str(size)]['seconds'],
+                                                      runs[str(size)]['peak_bytes'] / 2**20))
+        results[benchmark.name] = {'sizes': runs, 'exponent': scaling_exponent(runs)}
+        if log:
+            log('%-40s exponent %.2f' % (benchmark.name, results[benchmark.name]['exponent']))
+    return results
+
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(results, baseline, tolerance=0.25, min_seconds=1e-3):
+    """
+    Compares results with a baseline
+
+    Parameters
+    ----------
+    results, baseline : dicts returned by run_suite or load_results
+    tolerance : relative slowdown or memory increase still accepted
+    min_seconds : slowdowns smaller than this are timing noise
+
+    Returns
+    -------
+    list of (name, size, metric, baseline value, new value) of every regression
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for size, run in result['sizes'].items():
+            reference = baseline[name]['sizes'].get(size)
+            if reference is None:
+                continue
+            if run['seconds'] > reference['seconds'] * (1 + tolerance) + min_seconds:
+                regressions.append((name, size, 'seconds', reference['seconds'], run['seconds']))
+            if run['peak_bytes'] > reference['peak_bytes'] * (1 + tolerance):
+                regressions.append((name, size, 'peak_bytes', reference['peak_bytes'], run['peak_bytes']))
+    return regressions
@@ -1,36 +1,121 @@
 
+import os
+import datetime
 import numpy as np
+from .tools import Grid
+from .tools import to_obstacle_map
 from .tools import Isovist
 from .tools import Shortestpath
-from .tools import get_neighbors2D
-from .tools import get_neighbors3D
+from .tools import HierarchicalPath
+from .tools import isovist_from_point3D
+from .tools import isovist_count_map3D
+from .tools import count_neighbors
+from .tools import count_facades
+from .tools import facade_bitmask
 from .tools import calculate_distance_from_solids2D
 from .tools import calculate_voronois_from_solids2D
 from .tools import analyse_shadow_Bresenham_sorted
+from .tools import shadow_from_sun_ray
+from .tools import analyse_shadow_traversal
+from .tools import iter_sun_vectors
+from .tools import facade_exposure
+from .tools import open_volume
+from .tools import create_volume
+from .tools import process_slabs
+from .tools import process_layers
+from .tools import geodesic_distance
+from .tools import any_angle_path
+from .tools import rasterize_path
+from .tools import label_components
+from .tools import cached_result
+from .tools import enable_cache
+from .tools import disable_cache
+from .tools import instrument
+from .tools.instrument import progress
 
 
 __all__ = [
+    'Grid',
+    'to_obstacle_map',
     'analyse_neighbours2D',
     'analyse_neighbours3D',
+    'analyse_facades',
     'analyse_isovist_map2D',
+    'iter_isovist_map2D',
     'analyse_isovist2D',
+    'analyse_isovist3D',
+    'analyse_isovist_map3D',
     'analyse_shortestpath2D',
+    'analyse_hierarchical_path2D',
+    'analyse_any_angle_path2D',
+    'analyse_geodesic2D',
     'analyse_centrality2D',
+    'iter_centrality2D',
     'analyse_shadow',
+    'analyse_sun_hours',
+    'analyse_exposure',
     'analyse_distances2D',
-    'analyse_voronoi2D'
+    'analyse_voronoi2D',
+    'analyse_catchment2D',
+    'analyse_components',
+    'enable_cache',
+    'disable_cache',
+    'instrument'
 ]
 
 
-def analyse_neighbours2D(array):
+def _as_array(array):
+    """ occupancy of a Grid as numpy array, .npy files memory-mapped, numpy arrays are returned as they are """
+    if isinstance(array, Grid):
+        return array.obstacle_map
+    if isinstance(array, (str, os.PathLike)):
+        return open_volume(array)
+    return array
+
+
+def _key(index, shape):
+    """ 1D key of a (row, col) index, 1D keys are returned as they are """
+    if np.ndim(index) == 0:
+        return int(index)
+    return int(np.ravel_multi_index(tuple(index), shape))
+
+
+def _obstacle_map(array, lean=False):
+    """ -1 for solid and 0 for void cells, as int8 built from a boolean array in lean mode """
+    if lean:
+        return to_obstacle_map(array)
+    return array * -1
+
+
+def _result(out, shape, dtype):
+    """ out if given, a new .npy file if out is a path, otherwise a new array of zeros """
+    if out is None:
+        return np.zeros(shape, dtype=dtype)
+    if isinstance(out, (str, os.PathLike)):
+        return create_volume(out, shape, dtype)
+    if out.shape != shape:
+        raise Exception('out has to have the same shape as array!!')
+    return out
+
+
+def _count_dtype(n):
+    """ smallest signed integer dtype holding -1 to n """
+    return np.promote_types(np.min_scalar_type(-n), np.int8)
+
+
+def analyse_neighbours2D(array, out=None, lean=False):
 
     """
     Returns the amount of 2d neighbours per cell for any 2D or 3D array
     
     Parameters
     ----------
-    array: numpy ndarray
+    array: numpy ndarray, Grid or path of a .npy file
         2D or 3D numpy array with 0 for void cells, 1 for solid cells
+    out: numpy ndarray, np.memmap or path of a .npy file to create
+        optional array with the shape of array the result is written to
+    lean: bool
+        use the smallest suitable output dtype (uint8)
 
     Returns
     -------
@@ -43,65 +128,110 @@ def analyse_neighbours2D(array):
     >>>
     >>>
     """
+    array = _as_array(array)
 
     if array.ndim == 2:
-        values = np.full(array.shape, 0)
-        for x, y in np.ndindex(array.shape):
-            # only evaluate solid voxels
-            if array[x, y] > 0:
-                values[x][y] = get_neighbors2D(array, x, y)
-
-        return values
+        values = _result(out, array.shape, np.uint8 if lean else np.int64)
+        return np.multiply(count_neighbors(array), array > 0, out=values)
     
     elif array.ndim == 3:
-        values = np.full(array.shape, 0)
-        for x, y, z in np.ndindex(array.shape):
-            # only evaluate solid voxels
-            if array[x, y, z] > 0:
-                array_slice = array[:, :, z].reshape(array.shape[:2])
-                values[x][y][z] = get_neighbors2D(array_slice, x, y)
-
-        return values
+        # XY neighbours only, counted slice by slice
+        values = _result(out, array.shape, np.uint8 if lean else np.int64)
+        if isinstance(array, np.memmap) or isinstance(values, np.memmap):
+            # the neighbours in a layer only need the neighbouring rows, slabs along the contiguous first axis
+            return process_slabs(_solid_neighbors_xy, array, values, axis=0, halo=1)
+        return process_layers(_solid_neighbors, array, values)
     else:
         raise Exception('array has to be 2D or 3D!!')
 
 
-def analyse_neighbours3D(array):
+def _solid_neighbors(array):
+    return count_neighbors(array) * (array > 0)
 
-    if array.ndim == 2:
-        values = np.full(array.shape, 0)
-        for x, y in np.ndindex(array.shape):
-            # only evaluate solid voxels
-            if array[x, y] > 0:
-                values[x][y] = get_neighbors2D(array, x, y)
 
-        return values
-    
-    elif array.ndim == 3:
-        values = np.full(array.shape, 0)
-        for x, y, z in np.ndindex(array.shape):
-            # only evaluate solid voxels
-            if array[x, y, z] > 0:
-                values[x][y][z] = get_neighbors3D(array, x, y, z)
+def _solid_neighbors_xy(array):
+    """ XY neighbours of the solid cells of a 3D array, layer by layer """
+    values = np.empty(array.shape, dtype=np.uint8)
+    for z in range(array.shape[2]):
+        values[:, :, z] = _solid_neighbors(array[:, :, z])
+    return values
 
-        return values
-        
-    else:
+
+def analyse_neighbours3D(array, out=None, lean=False):
+    """
+    Returns the amount of face connected neighbours per cell for any 2D (4 neighbours) or 3D (6 neighbours) array
+
+    Parameters
+    ----------
+    array: numpy ndarray, Grid or path of a .npy file
+        2D or 3D numpy array with 0 for void cells, 1 for solid cells
+    out: numpy ndarray, np.memmap or path of a .npy file to create
+        optional array with the shape of array the result is written to
+    lean: bool
+        use the smallest suitable output dtype (uint8)
+
+    Returns
+    -------
+    numpy array
+        2D or 3D numpy array of values representing how many solid neighbours each solid cell has.
+    """
+    array = _as_array(array)
+
+    if array.ndim > 3 or array.ndim < 2:
         raise Exception('array has to be 2D or 3D!!')
 
+    values = _result(out, array.shape, np.uint8 if lean else np.int64)
+    if isinstance(array, np.memmap) or isinstance(values, np.memmap):
+        # slabs along the first (contiguous) axis with the neighbouring layers as halo
+        return process_slabs(_solid_neighbors, array, values, axis=0, halo=1)
+    return np.multiply(count_neighbors(array), array > 0, out=values)
+
+
+def analyse_facades(array):
+    """
+    Returns the exposed faces per cell for any 2D or 3D array
+
+    Parameters
+    ----------
+    array: numpy ndarray or Grid
+        2D or 3D numpy array with 0 for void cells, 1 for solid cells
+
+    Returns
+    -------
+    numpy array
+        2D or 3D numpy array with the amount of faces of each solid cell touching void or the boundary
+    numpy array
+        2D or 3D uint8 numpy array with the exposed faces of each solid cell as bits
+        FACE_WEST (-x), FACE_EAST (+x), FACE_SOUTH (-y), FACE_NORTH (+y), FACE_DOWN (-z), FACE_UP (+z)
+    """
+    if isinstance(array, Grid):
+        # copies, the cached arrays of the Grid are read-only
+        return array.facade_counts.copy(), array.facade_bitmask.copy()
+
+    bitmask = facade_bitmask(array)
+    return count_facades(array, bitmask), bitmask
+
 
-def analyse_isovist_map2D(array, radius=None, mode='void'):
+@cached_result
+def analyse_isovist_map2D(array, radius=None, mode='void', out=None, lean=False, dtype=None):
     """
     Analyses 2D visibility for any numpy array >= 2 Dimensions.
     If 3D, XY layers will be analysed
     
     Parameters
     ----------
-    array: numpy ndarray
+    array: numpy ndarray, Grid or path of a .npy file
         2D or 3D numpy array with 0 for void cells, 1 for solid cells
     mode: string
         string 'void' or 'solid'. 'void' returns isovist map of all void cells.
         'solid' returns isovist map of all solid cells
+    out: numpy ndarray, np.memmap or path of a .npy file to create
+        optional array with the shape of array the result is written to
+    lean: bool
+        work on int8 obstacle maps and use the smallest suitable output dtype (int8)
+    dtype: numpy dtype
+        dtype of the result, e.g. np.float32 to keep fractional percentages.
+        Defaults to int64 (int8 in lean mode)
 
 
     Returns
@@ -115,21 +245,28 @@ def analyse_isovist_map2D(array, radius=None, mode='void'):
     >>> array = np.random.randint(2, size=(2, 4))
     >>> isovist_map = analyse_isovist_map2D(array, mode='solid')
     """
+    array = _as_array(array)
+
     if array.ndim == 2:
-        return _analyse_isovist_map_xy(array, radius, mode)
+        values = _analyse_isovist_map_xy(array, radius, mode, lean, dtype)
+        if out is None:
+            return values
+        out = _result(out, array.shape, values.dtype)
+        out[...] = values
+        return out
     
     elif array.ndim == 3:
-        values = np.full(array.shape, 0)
-        for z in range(values.shape[2]):
-            values[:, :, z] = _analyse_isovist_map_xy(array[:, :, z], radius, mode)    
-        return values
+        if dtype is None:
+            dtype = np.int8 if lean else np.int64
+        values = _result(out, array.shape, dtype)
+        return process_layers(lambda layer: _analyse_isovist_map_xy(layer, radius, mode, lean, dtype), array, values)
 
     else:
         raise Exception('array has to be 2D or 3D!!')
 
 
-def _analyse_isovist_map_xy(array, radius=None, mode='void'):
-    isovist = Isovist(array * -1, radius)
+def _analyse_isovist_map_xy(array, radius=None, mode='void', lean=False, dtype=None):
+    isovist = Isovist(_obstacle_map(array, lean), radius, dtype)
 
     if mode == 'void':
         return isovist.isovist_map(format=1)
@@ -139,59 +276,193 @@ def _analyse_isovist_map_xy(array, radius=None, mode='void'):
         return
 
 
-def analyse_isovist2D(array, radius=None, view_point=[0,0]):
+def iter_isovist_map2D(array, radius=None, mode='void', lean=False):
+    """
+    Generator variant of analyse_isovist_map2D, yielding each result as soon as it is computed.
+    For 3D arrays one XY layer after the other, for 2D arrays one cell after the other.
+
+    Parameters
+    ----------
+    array: numpy ndarray, Grid or path of a .npy file
+        2D or 3D numpy array with 0 for void cells, 1 for solid cells
+    mode: string
+        string 'void' or 'solid', see analyse_isovist_map2D
+    lean: bool
+        work on int8 obstacle maps
+
+    Yields
+    ------
+    (z, numpy array)
+        for 3D arrays the index of the XY layer and its 2D isovist map
+    ((row, col), float)
+        for 2D arrays the index of a void (or solid) cell and its visibility percentage
+    """
+    array = _as_array(array)
+
+    if array.ndim == 2:
+        if mode not in ('void', 'solid'):
+            return
+        isovist = Isovist(_obstacle_map(array, lean), radius)
+        yield from isovist.iter_isovist_map(collision=mode == 'solid')
+
+    elif array.ndim == 3:
+        for z in range(array.shape[2]):
+            yield z, _analyse_isovist_map_xy(np.asarray(array[:, :, z]), radius, mode, lean)
+
+    else:
+        raise Exception('array has to be 2D or 3D!!')
+
+
+def analyse_isovist2D(array, radius=None, view_point=[0,0], lean=False):
     """ Analyses 2D visibility for any numpy array >= 2 Dimensions.
     Based on a given viewpoint.
 
     Parameters
     ----------
-    array: numpy ndarray
+    array: numpy ndarray or Grid
         2D or 3D numpy array with 0 for void cells, 1 for solid cells
     view_point: list or tuple
         the index of the viewpoint in the array.
         It needs to be inside of the array and have same dimension with the array
+    lean: bool
+        work on an int8 obstacle map, the result is int8 as well
 
     Returns
     -------
     numpy ndarray
         2D or 3D numpy array with 1 for visible cells, 0 for invisible cells, -1 for solid cells.
     """
+    array = _as_array(array)
+
     if array.ndim == 2:
-        return _analyse_isovist_map_xy(array, radius, view_point)
+        return _analyse_isovist_xy(array, radius, view_point, lean)
     
     elif array.ndim == 3:
-        raise NotImplementedError
+        raise NotImplementedError('use analyse_isovist3D for 3D visibility')
 
     else:
         raise Exception('array has to be 2D or 3D!!')
 
 
-def _analyse_isovist_xy(array, radius, view_point):
-    isovist = Isovist(array * -1, radius)
+def _analyse_isovist_xy(array, radius, view_point, lean=False):
+    isovist = Isovist(_obstacle_map(array, lean), radius)
     return isovist.isovist_from_point(view_point, format=1)
 
 
-def analyse_shortestpath2D(array, sp, ep):
+def analyse_isovist3D(array, radius=None, view_point=[0,0,0], out=None, lean=False):
+    """ Analyses 3D visibility (viewshed) for a 3D numpy array from a given viewpoint.
+    Rays are shot from the viewpoint in a spherical ray set and traversed voxel by voxel.
+
+    Parameters
+    ----------
+    array: numpy ndarray or Grid
+        3D numpy array with 0 for void cells, 1 for solid cells
+    radius: float
+        maximum viewing distance in cells, None for unlimited
+    view_point: list or tuple
+        the index of the viewpoint in the array.
+        It needs to be inside of the array and have same dimension with the array
+    out: numpy ndarray
+        optional array with the shape of array the result is written to
+    lean: bool
+        use the smallest suitable output dtype (int8)
+
+    Returns
+    -------
+    numpy ndarray
+        3D numpy array with 1 for visible cells, 0 for invisible cells, -1 for solid cells.
+    """
+    array = _as_array(array)
+
+    if array.ndim != 3:
+        raise Exception('array has to be 3D!!')
+
+    visible = isovist_from_point3D(array, view_point, radius)
+    values = _result(out, array.shape, np.int8 if lean else np.int64)
+    values[...] = 0
+    values[array > 0] = -1
+    values[visible] = 1
+    return values
+
+
+def analyse_isovist_map3D(array, radius=None, view_points=None, out=None, lean=False):
+    """ Counts the visible void cells of a 3D numpy array for many viewpoints.
+    Viewpoints are evaluated in parallel.
+
+    Parameters
+    ----------
+    array: numpy ndarray or Grid
+        3D numpy array with 0 for void cells, 1 for solid cells
+    radius: float
+        maximum viewing distance in cells, None for unlimited
+    view_points: numpy ndarray
+        (n, 3) indices of the viewpoints, solid viewpoints (e.g. windows) look out of their own cell.
+        Defaults to all void cells
+    out: numpy ndarray
+        optional array with the shape of array the result is written to
+    lean: bool
+        use the smallest integer dtype that holds the counts
+
+    Returns
+    -------
+    numpy ndarray
+        3D numpy array with the number of visible void cells for every viewpoint,
+        0 for the rest of void cells, -1 for the rest of solid cells.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> array = np.random.randint(2, size=(8, 8, 8))
+    >>> windows = np.argwhere(array[:, :, 4] > 0)
+    >>> windows = np.insert(windows, 2, 4, axis=1)
+    >>> isovist_map = analyse_isovist_map3D(array, radius=5, view_points=windows)
+    """
+    array = _as_array(array)
+
+    if array.ndim != 3:
+        raise Exception('array has to be 3D!!')
+
+    if view_points is None:
+        view_points = np.argwhere(array == 0)
+    view_points = np.reshape(view_points, (-1, 3))
+
+    values = _result(out, array.shape, _count_dtype(array.size) if lean else np.int64)
+    values[...] = 0
+    values[array > 0] = -1
+    values[tuple(view_points.T)] = isovist_count_map3D(array, view_points, radius)
+    return values
+
+
+def analyse_shortestpath2D(array, sp, ep, lean=False, cost_map=None):
     """ Analyses the shortest path in a 2D numpy array.
     
     Parameters
     ----------
-    array: numpy ndarray
+    array: numpy ndarray or Grid
         2D or 3D numpy array with values of 0 and 1
-    sp: list or tuple
-        the index of the starting point in the array.
+    sp: list, tuple or int
+        the (row, col) index of the starting point in the array, or its 1D key (row * cols + col).
         It needs to be inside of the array and have same dimension with the array
-    ep: list or tuple
-        the index of the ending point in the array.
+    ep: list, tuple or int
+        the (row, col) index of the ending point in the array, or its 1D key (row * cols + col).
         It needs to be inside of the array and have same dimension with the array  
+    lean: bool
+        work on an int8 obstacle map, the result is int8 as well
+    cost_map: numpy ndarray
+        optional 2D float array with the traversal cost of each cell, a step costs its length
+        times the mean cost of both cells
     
     Returns
     -------
     numpy ndarray
         2D or 3D numpy array with 1 for path cells, 0 for the rest of void cells, -1 for solid cells.
     """
+    if isinstance(array, Grid) and array.ndim == 2 and cost_map is None:
+        return array.shortest_path.get_shortest_path(_key(sp, array.shape), _key(ep, array.shape), format=1)
+    array = _as_array(array)
+
     if array.ndim == 2:
-        return _analyse_shortestpath_xy(array, sp, ep)
+        return _analyse_shortestpath_xy(array, sp, ep, lean, cost_map)
     
     elif array.ndim == 3:
         raise NotImplementedError
@@ -200,71 +471,344 @@ def analyse_shortestpath2D(array, sp, ep):
         raise Exception('array has to be 2D or 3D!!')
 
 
-def _analyse_shortestpath_xy(array, sp, ep):
-    shortest_path = Shortestpath(array * -1)
-    return shortest_path.get_shortest_path(sp, ep, format=1)
+def _analyse_shortestpath_xy(array, sp, ep, lean=False, cost_map=None):
+    shortest_path = _shortest_path(array, lean, cost_map)
+    return shortest_path.get_shortest_path(_key(sp, array.shape), _key(ep, array.shape), format=1)
+
+
+def analyse_hierarchical_path2D(array, sp, ep, cluster_size=32, lean=False):
+    """ Analyses a near-optimal shortest path in a 2D numpy array with hierarchical pathfinding (HPA*).
+    Building the abstraction costs about one search of the array, queries then cost about the amount of clusters
+    along the route, so a Grid, which keeps the abstraction, pays off for many queries on the same plan.
+
+    Parameters
+    ----------
+    array: numpy ndarray or Grid
+        2D numpy array with values of 0 and 1
+    sp: list, tuple or int
+        the (row, col) index of the starting point in the array, or its 1D key (row * cols + col)
+    ep: list, tuple or int
+        the (row, col) index of the ending point in the array, or its 1D key (row * cols + col)
+    cluster_size: int
+        edge length of the clusters in cells
+    lean: bool
+        work on an int8 obstacle map, the result is int8 as well
+
+    Returns
+    -------
+    numpy ndarray
+        2D numpy array with 1 for path cells, 0 for the rest of void cells, -1 for solid cells.
+    float
+        length of the path, -1 if the ending point cannot be reached
+    """
+    if isinstance(array, Grid) and array.ndim == 2:
+        hierarchical_path = array.hierarchical_path(cluster_size)
+    else:
+        array = _as_array(array)
+        if array.ndim == 3:
+            raise NotImplementedError
+        elif array.ndim != 2:
+            raise Exception('array has to be 2D or 3D!!')
+        hierarchical_path = HierarchicalPath(_obstacle_map(array, lean), cluster_size)
+
+    shape = hierarchical_path.shape
+    path, length = hierarchical_path.find_path(_key(sp, shape), _key(ep, shape))
+    values = hierarchical_path.obstacle_map.copy()
+    values.flat[path] = 1
+    return values, length
+
+
+def analyse_any_angle_path2D(array, sp, ep, lean=False):
+    """ Analyses the any-angle (Theta*) shortest path in a 2D numpy array.
+    The path consists of straight segments between cells that see each other.
+
+    Parameters
+    ----------
+    array: numpy ndarray or Grid
+        2D numpy array with values of 0 and 1
+    sp: list or tuple
+        the (row, col) index of the starting point in the array
+    ep: list or tuple
+        the (row, col) index of the ending point in the array
+    lean: bool
+        work on an int8 obstacle map, the result is int8 as well
+
+    Returns
+    -------
+    numpy ndarray
+        2D numpy array with 1 for path cells, 0 for the rest of void cells, -1 for solid cells.
+    float
+        length of the path, -1 if the ending point cannot be reached
+    """
+    array = _as_array(array)
+
+    if array.ndim == 2:
+        waypoints, length = any_angle_path(array, sp, ep)
+        values = _obstacle_map(array, lean)
+        values[rasterize_path(waypoints, array.shape)] = 1
+        return values, length
+
+    elif array.ndim == 3:
+        raise NotImplementedError
+
+    else:
+        raise Exception('array has to be 2D or 3D!!')
+
+
+def analyse_geodesic2D(array, sources, cost_map=None, method='fast_marching'):
+    """ Analyses the walking distance of every void cell to the closest of one or many sources,
+    measured along Euclidean paths around the solid cells instead of 8 connected grid steps.
+
+    Parameters
+    ----------
+    array: numpy ndarray or Grid
+        2D numpy array with values of 0 and 1
+    sources: list, tuple or numpy ndarray
+        (row, col) index of a source cell or (n, 2) array of source cells
+    cost_map: numpy ndarray
+        optional 2D float array with the walking cost per unit length of each cell
+    method: string
+        'fast_marching' (eikonal solver, supports cost_map) or 'any_angle' (Theta*)
+
+    Returns
+    -------
+    numpy ndarray
+        2D float numpy array with the distance to the closest source, -1 for solid and unreachable cells.
+    """
+    array = _as_array(array)
+
+    if array.ndim == 2:
+        return geodesic_distance(array, sources, cost_map, method)
+
+    elif array.ndim == 3:
+        raise NotImplementedError
+
+    else:
+        raise Exception('array has to be 2D or 3D!!')
 
 
-def analyse_centrality2D(array):
+# version 2: normalised per connected component, cost_map
+@cached_result(version=2)
+def analyse_centrality2D(array, out=None, lean=False, dtype=np.int64, cost_map=None):
     """
     Returns centrality map
     
     Parameters
     ----------
-    array: numpy ndarray
+    array: numpy ndarray or Grid
         2D or 3D numpy array with values of 0 and 1
+    out: numpy ndarray
+        optional array with the shape of array the result is written to
+    lean: bool
+        work on an int8 obstacle map with float32 distances and int32 indices
+    dtype: numpy dtype
+        dtype of the result, a float dtype keeps the fractional part
+    cost_map: numpy ndarray
+        optional 2D float array with the traversal cost of each cell, see analyse_shortestpath2D
     
     Returns
     -------
     numpy ndarray:
         numpy array with centrality percentage for each cell
     """
-    if array.ndim == 2:
-        return _analyse_centrality_xy(array)
-    
-    elif array.ndim == 3:
-        raise NotImplementedError
+    if isinstance(array, Grid) and array.ndim == 2 and cost_map is None:
+        values = array.shortest_path.get_centrality(format=1, dtype=dtype)
+    else:
+        array = _as_array(array)
+        if array.ndim == 2:
+            values = _shortest_path(array, lean, cost_map).get_centrality(format=1, dtype=dtype)
+        elif array.ndim == 3:
+            raise NotImplementedError
+        else:
+            raise Exception('array has to be 2D or 3D!!')
+
+    if out is None:
+        return values
+    out[...] = values
+    return out
+
+
+def iter_centrality2D(array, lean=False):
+    """
+    Generator variant of analyse_centrality2D, yielding the centrality of one void cell after the other
 
+    Parameters
+    ----------
+    array: numpy ndarray or Grid
+        2D numpy array with values of 0 and 1
+    lean: bool
+        work on an int8 obstacle map
+
+    Yields
+    ------
+    ((row, col), float)
+        index of a void cell and its centrality
+    """
+    if isinstance(array, Grid) and array.ndim == 2:
+        shortest_path = array.shortest_path
     else:
-        raise Exception('array has to be 2D or 3D!!')
+        array = _as_array(array)
+        if array.ndim == 3:
+            raise NotImplementedError
+        elif array.ndim != 2:
+            raise Exception('array has to be 2D or 3D!!')
+        shortest_path = _shortest_path(array, lean)
+
+    shape = shortest_path.obstacle_map.shape
+    for k, centrality in shortest_path.iter_centrality():
+        yield np.unravel_index(k, shape), centrality
 
 
-def _analyse_centrality_xy(array):
-    shortest_path = Shortestpath(array * -1)
-    return shortest_path.get_centrality(format=1)
+def _shortest_path(array, lean=False, cost_map=None):
+    """ Shortestpath of a 2D array, with float32 distances and int32 indices in lean mode """
+    if lean:
+        return Shortestpath(_obstacle_map(array, lean), dtype=np.float32, index_dtype=np.int32, cost_map=cost_map)
+    return Shortestpath(_obstacle_map(array), cost_map=cost_map)
 
 
-def analyse_shadow(array, light_vectors):
+@cached_result
+def analyse_shadow(array, light_vectors, mode='bresenham', out=None, lean=False):
     """Analyses shadow for any 3D array
 
     Parameters
     ----------
-    array: numpy ndarray
+    array: numpy ndarray or Grid
         2D or 3D numpy array with values of 0 and 1
     light_vectors: list of vectors(tuple of 3 float)
         vectors represent light direction
+    mode: string
+        'bresenham' casts shadow lines with the 3D Bresenham algorithm.
+        'exact' shades every solid cell whose centre is closer than 0.5 to a shadow ray (conservative).
+        'traversal' shades every solid cell crossed by a shadow ray (Amanatides-Woo traversal)
+    out: numpy ndarray
+        optional array with the shape of array the shadow counts are added to
+    lean: bool
+        use the smallest integer dtype that holds the number of light vectors
     
     Returns
     -------
     numpy ndarray:
         numpy array with 1 as shadow, 0 as not in shadow
     """
-    shadow_map = np.zeros(array.shape, dtype=int)
-    for vec in light_vectors:
-        light = np.array(vec, dtype=np.float)
-        shadow_map += analyse_shadow_Bresenham_sorted(array, light)
+    array = _as_array(array)
+
+    if lean and hasattr(light_vectors, '__len__'):
+        shadow_map = _result(out, array.shape, _count_dtype(len(light_vectors)))
+    else:
+        shadow_map = _result(out, array.shape, int)
+    total = len(light_vectors) if hasattr(light_vectors, '__len__') else None
+    for i, vec in enumerate(light_vectors):
+        light = np.array(vec, dtype=np.float64)
+        if mode == 'bresenham':
+            shadow_map += analyse_shadow_Bresenham_sorted(array, light)
+        elif mode == 'exact':
+            shadow_map += shadow_from_sun_ray(array, light) > 0
+        elif mode == 'traversal':
+            shadow_map += analyse_shadow_traversal(array, light)
+        else:
+            raise Exception('mode has to be bresenham, exact or traversal!!')
+        progress('shadow', i + 1, total)
     
     return shadow_map
 
 
-def analyse_distances2D(array):
+def analyse_sun_hours(array, latitude, longitude, start, end, step=datetime.timedelta(minutes=10), utc_offset=0,
+                      out=None):
+    """Analyses the hours of direct sun for any 3D array over a period of time
+
+    Sun vectors are generated locally and streamed through the shadow engine one by one,
+    so only a single shadow mask is held in memory at any time.
+
+    Parameters
+    ----------
+    array: numpy ndarray or Grid
+        3D numpy array with values of 0 and 1, axes x east, y north, z up
+    latitude: float
+        latitude of the site in degrees, north positive
+    longitude: float
+        longitude of the site in degrees, east positive
+    start: datetime
+        start of the period, local time
+    end: datetime
+        end of the period, local time
+    step: timedelta
+        time between two sun positions
+    utc_offset: float
+        offset of the local time to UTC in hours
+    out: numpy ndarray
+        optional float array with the shape of array the sun hours are added to
+
+    Returns
+    -------
+    numpy ndarray:
+        float32 numpy array with hours of direct sun for each solid cell, 0 for void cells
+
+    Examples
+    --------
+    >>> import datetime
+    >>> array = np.random.randint(2, size=(8, 8, 8))
+    >>> start = datetime.datetime(2021, 6, 21)
+    >>> sun_hours = analyse_sun_hours(array, 47.37, 8.54, start, start + datetime.timedelta(days=1), utc_offset=2)
+    """
+    array = _as_array(array)
+
+    solid = array > 0
+    sun_hours = _result(out, array.shape, np.float32)
+    for i, (vec, weight) in enumerate(iter_sun_vectors(latitude, longitude, start, end, step, utc_offset)):
+        lit = analyse_shadow_Bresenham_sorted(solid, vec)
+        np.logical_not(lit, out=lit)
+        np.logical_and(lit, solid, out=lit)
+        np.add(sun_hours, weight, out=sun_hours, where=lit)
+        progress('sun_hours', i + 1, None)
+
+    return sun_hours
+
+
+def analyse_exposure(array, light_vectors, weights=None, out=None):
+    """Analyses cosine weighted direct exposure of the facade faces of any 3D array
+
+    Parameters
+    ----------
+    array: numpy ndarray or Grid
+        3D numpy array with values of 0 and 1
+    light_vectors: list of vectors(tuple of 3 float)
+        vectors represent light direction
+    weights: list of float
+        weight of each light vector, e.g. the hours returned by sun_vectors. Defaults to 1
+    out: numpy ndarray
+        optional float array of shape (*array.shape, 6) the exposure is added to
+
+    Returns
+    -------
+    numpy ndarray:
+        float32 numpy array of shape (*array.shape, 6) with the exposure of the
+        -x, +x, -y, +y, -z, +z faces of each solid cell, 0 for hidden faces and void cells
+
+    Examples
+    --------
+    >>> import datetime
+    >>> array = np.random.randint(2, size=(8, 8, 8))
+    >>> start = datetime.datetime(2021, 6, 21)
+    >>> vectors, hours = sun_vectors(47.37, 8.54, start, start + datetime.timedelta(days=1), utc_offset=2)
+    >>> exposure = analyse_exposure(array, vectors, hours)
+    """
+    array = _as_array(array)
+
+    return facade_exposure(array, light_vectors, weights, out)
+
+
+def analyse_distances2D(array, out=None, lean=False):
     """
     Returns the distances of void cells to their closest solid cells 
     
     Parameters
     ----------
-    array: numpy ndarray
+    array: numpy ndarray, Grid or path of a .npy file
         2D or 3d numpy array with 0 for void cells, and >1 for solid cells
+    out: numpy ndarray, np.memmap or path of a .npy file to create
+        optional array with the shape of array the result is written to
+    lean: bool
+        use float32 instead of float64 for 3D arrays
 
     Returns
     -------
@@ -272,33 +816,43 @@ def analyse_distances2D(array):
         2D or 3d numpy array of values representing the index of a solid cell which is closest to a void
 
     """
+    if isinstance(array, Grid):
+        if out is None:
+            return array.distance_field.copy()
+        out = _result(out, array.shape, array.distance_field.dtype)
+        out[...] = array.distance_field
+        return out
+    array = _as_array(array)
 
     if array.ndim == 2:
         values = calculate_distance_from_solids2D(array)
-
-        return values
+        if out is None:
+            return values
+        out = _result(out, array.shape, values.dtype)
+        out[...] = values
+        return out
     
     elif array.ndim == 3:
 
-        values = np.full(array.shape, 0)
-        for z in range(values.shape[2]):
-            array_slice = array[:, :, z].reshape(array.shape[:2])
-            values[:, :, z] = calculate_distance_from_solids2D(array_slice)   
-
-        return values
+        values = _result(out, array.shape, np.float32 if lean else np.float64)
+        return process_layers(calculate_distance_from_solids2D, array, values)
     
     else:
         raise Exception('array has to be 2D or 3D!!')
 
 
-def analyse_voronoi2D(array):
+def analyse_voronoi2D(array, out=None, lean=False):
     """
     Returns the indices of the solid cell which is closer to every void cell 
     
     Parameters
     ----------
-    array: numpy ndarray
+    array: numpy ndarray, Grid or path of a .npy file
         2D or 3d numpy array with 0 for void cells, and >1 for solid cells
+    out: numpy ndarray, np.memmap or path of a .npy file to create
+        optional array with the shape of array the result is written to
+    lean: bool
+        use the dtype of array instead of int64 for 3D arrays
 
     Returns
     -------
@@ -306,24 +860,98 @@ def analyse_voronoi2D(array):
         2D or 3d numpy array of values representing the index of a solid cell which is closer every void cell
 
     """
+    array = _as_array(array)
 
     if array.ndim == 2:
         values = calculate_voronois_from_solids2D(array)
-
-        return values
+        if out is None:
+            return values
+        out = _result(out, array.shape, values.dtype)
+        out[...] = values
+        return out
     
     elif array.ndim == 3:
 
-        values = np.full(array.shape, 0)
-        for z in range(values.shape[2]):
-            array_slice = array[:, :, z].reshape(array.shape[:2])
-            values[:, :, z] = calculate_voronois_from_solids2D(array_slice)   
-
-        return values
+        values = _result(out, array.shape, array.dtype if lean else np.int64)
+        return process_layers(calculate_voronois_from_solids2D, array, values)
     
     else:
         raise Exception('array has to be 2D or 3D!!')
 
 
+def analyse_catchment2D(array, sources, lean=False, cost_map=None):
+    """
+    Returns the walking distance of every void cell to the nearest of many sources (exits, stairs)
+    and which source it is, the walking distance counterpart of analyse_voronoi2D.
+    All sources are searched at once, in the time of a single shortest path search.
+
+    Parameters
+    ----------
+    array: numpy ndarray or Grid
+        2D numpy array with values of 0 and 1
+    sources: list, tuple or numpy ndarray
+        (row, col) index of a source cell or (n, 2) array of source cells
+    lean: bool
+        work on an int8 obstacle map with float32 distances and int32 indices
+    cost_map: numpy ndarray
+        optional 2D float array with the traversal cost of each cell, see analyse_shortestpath2D
+
+    Returns
+    -------
+    numpy ndarray
+        2D numpy array with the distance to the nearest source, -1 for solid and unreachable cells
+    numpy ndarray
+        2D numpy array with the position in sources of the nearest source, -1 for solid and unreachable cells
+    """
+    if isinstance(array, Grid) and array.ndim == 2 and cost_map is None:
+        shortest_path = array.shortest_path
+    else:
+        array = _as_array(array)
+        if array.ndim == 2:
+            shortest_path = _shortest_path(array, lean, cost_map)
+        elif array.ndim == 3:
+            raise NotImplementedError
+        else:
+            raise Exception('array has to be 2D or 3D!!')
+
+    sources = np.reshape(sources, (-1, 2))
+    keys = np.ravel_multi_index((sources[:, 0], sources[:, 1]), shortest_path.obstacle_map.shape)
+    return shortest_path.get_nearest_source(keys, format=1)
+
+
+def analyse_components(array, connectivity=None, out=None):
+    """
+    Returns the connected component of every void cell, e.g. the rooms of a plan that reach each other
+
+    Parameters
+    ----------
+    array: numpy ndarray, Grid or path of a .npy file
+        2D or 3D numpy array with 0 for void cells, and >0 for solid cells
+    connectivity: int
+        4 or 8 (default) for 2D arrays, 6, 18 or 26 (default) for 3D arrays
+    out: numpy ndarray, np.memmap or path of a .npy file to create
+        optional array with the shape of array the result is written to
+
+    Returns
+    -------
+    numpy ndarray
+        2D or 3D int64 numpy array with the component (0 to n-1) of every void cell, -1 for solid cells
+    int
+        amount of components
+    """
+    array = _as_array(array)
+
+    if array.ndim == 2 or array.ndim == 3:
+        values, n = label_components(array, connectivity)
+        if out is None:
+            return values, n
+        out = _result(out, array.shape, values.dtype)
+        out[...] = values
+        return out, n
+
+    else:
+        raise Exception('array has to be 2D or 3D!!')
+
+
 if __name__ == '__main__':
     pass
\ No newline at end of file
@@ -1,9 +1,20 @@
+from .traversal import *
 from .grid import *
 from .isovist import *
+from .isovist3D import *
 from .shortest_path import *
 from .shadow import *
 from .neighbors import *
 from .distances import *
 from .shadow_Bresenham import *
+from .sun import *
+from .exposure import *
+from .chunked import *
+from .cache import *
+from .instrument import *
+from .geodesic import *
+from .components import *
+from .hierarchical import *
+from .warmup import *
 
 __all__ = [name for name in dir() if not name.startswith('_')]
\ No newline at end of file
@@ -0,0 +1,17 @@
+"""
+Compiles the numba kernels into the on-disk cache and lists the compiled signatures
+
+    python -m grid_analytics.tools
+"""
+import sys
+from .warmup import warmup
+
+
+def main():
+    for name, signatures in warmup().items():
+        print('%-30s %d' % (name, signatures))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
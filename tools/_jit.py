@@ -0,0 +1,59 @@
+import functools
+
+
+def prange(*args):
+    """ range of parallel loops, replaced by numba.prange when the function is compiled """
+    return range(*args)
+
+
+# every LazyJit function, in definition order
+_registry = []
+
+
+class LazyJit:
+    """ Function compiled with numba on its first call
+
+    numba is imported and the function compiled (with an on-disk cache) only when it is first used,
+    so importing the package does not pay for numba. Other LazyJit functions called by the function
+    and prange are replaced by their numba counterparts before compiling.
+    """
+
+    def __init__(self, function, options):
+        self.function = function
+        self.options = options
+        self._dispatcher = None
+        functools.update_wrapper(self, function)
+        _registry.append(self)
+
+    @property
+    def dispatcher(self):
+        if self._dispatcher is None:
+            import numba
+            namespace = self.function.__globals__
+            for name in self.function.__code__.co_names:
+                value = namespace.get(name)
+                if isinstance(value, LazyJit):
+                    namespace[name] = value.dispatcher
+                elif value is prange:
+                    namespace[name] = numba.prange
+            try:
+                self._dispatcher = numba.jit(cache=True, **self.options)(self.function)
+            except RuntimeError:
+                # no writable cache location
+                self._dispatcher = numba.jit(**self.options)(self.function)
+            # later calls from the module go straight to numba
+            if namespace.get(self.function.__name__) is self:
+                namespace[self.function.__name__] = self._dispatcher
+        return self._dispatcher
+
+    def __call__(self, *args, **kwargs):
+        return self.dispatcher(*args, **kwargs)
+
+
+def jit(function=None, **options):
+    """
+    Lazy drop-in for numba.jit, usable as @jit or @jit(nopython=True, ...)
+    """
+    if function is None:
+        return lambda f: LazyJit(f, options)
+    return LazyJit(function, options)
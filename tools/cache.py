@@ -0,0 +1,192 @@
+import os
+import glob
+import hashlib
+import inspect
+import functools
+import numpy as np
+
+
+__all__ = ['ResultCache',
+           'enable_cache',
+           'disable_cache',
+           'get_cache',
+           'cached_result']
+
+
+class ResultCache:
+    """ On-disk cache of analysis results
+
+    Results are stored as compressed .npz files named by a hash of the input arrays, the function,
+    its version and its parameters. When the cache grows beyond max_bytes the least recently used results are removed.
+
+    Attributes
+    ----------
+    directory : path of the cache directory, created if missing
+    max_bytes : maximum size of all stored results in bytes
+    hits, misses : amount of lookups answered and not answered by the cache
+    """
+
+    def __init__(self, directory, max_bytes=2**30):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, name, arguments, version=1):
+        """ hash of the function name, its version and its arguments """
+        h = hashlib.blake2b(digest_size=20)
+        h.update(b'%d:%d:' % (CACHE_VERSION, version))
+        h.update(name.encode())
+        for arg_name in sorted(arguments):
+            h.update(arg_name.encode())
+            _update_hash(h, arguments[arg_name])
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def load(self, key):
+        """ stored result or None """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                result = data['result']
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        # mark as recently used
+        os.utime(path)
+        self.hits += 1
+        return result
+
+    def store(self, key, result):
+        path = self._path(key)
+        # write to a temporary file first, concurrent readers never see partial files
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, result=result)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """ removes the least recently used results until the cache is smaller than max_bytes """
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*.npz')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    @property
+    def nbytes(self):
+        return sum(os.path.getsize(path) for path in glob.glob(os.path.join(self.directory, '*.npz')))
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, '*.npz')):
+            os.remove(path)
+
+
+def _update_hash(h, value):
+    if isinstance(value, np.ndarray):
+        h.update(b'ndarray')
+        h.update(str(value.dtype).encode())
+        h.update(str(value.shape).encode())
+        h.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, (list, tuple)):
+        h.update(b'sequence%d' % len(value))
+        for item in value:
+            _update_hash(h, item)
+    elif hasattr(value, 'obstacle_map'):
+        # Grid
+        _update_hash(h, value.obstacle_map)
+    else:
+        h.update(repr(value).encode())
+
+
+# changed whenever stored results of all functions become invalid
+CACHE_VERSION = 1
+
+_cache = None
+
+
+def enable_cache(directory, max_bytes=2**30):
+    """
+    Enables the on-disk cache for the analyses decorated with cached_result
+
+    Parameters
+    ----------
+    directory : path of the cache directory
+    max_bytes : maximum size of the cache in bytes, least recently used results are removed first
+
+    Returns
+    -------
+    the ResultCache
+    """
+    global _cache
+    _cache = ResultCache(directory, max_bytes)
+    return _cache
+
+
+def disable_cache():
+    global _cache
+    _cache = None
+
+
+def get_cache():
+    """ the active ResultCache or None """
+    return _cache
+
+
+def cached_result(function=None, version=1):
+    """
+    Decorator looking up the result of an analysis in the cache enabled with enable_cache,
+    usable as @cached_result or @cached_result(version=2).
+    Calls with an out array bypass the cache, iterators among the arguments are read into lists.
+
+    Parameters
+    ----------
+    version : version of the results of the function, increase it whenever a change of the function
+              or of the kernels it uses changes its results, so results stored before are not used anymore
+    """
+    if function is None:
+        return lambda f: cached_result(f, version)
+    signature = inspect.signature(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _cache is None:
+            return function(*args, **kwargs)
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        if bound.arguments.get('out') is not None:
+            return function(*bound.args, **bound.kwargs)
+        for name, value in bound.arguments.items():
+            if inspect.isgenerator(value) or hasattr(value, '__next__'):
+                bound.arguments[name] = list(value)
+
+        arguments = {name: value for name, value in bound.arguments.items() if name != 'out'}
+        if isinstance(arguments.get('array'), (str, os.PathLike)):
+            arguments['array'] = np.load(arguments['array'], mmap_mode='r')
+        key = _cache.key(function.__module__ + '.' + function.__qualname__, arguments, version)
+
+        result = _cache.load(key)
+        if result is None:
+            result = function(*bound.args, **bound.kwargs)
+            _cache.store(key, result)
+        return result
+
+    wrapper.cache_version = version
+    return wrapper
@@ -0,0 +1,189 @@
+import os
+import mmap
+import tempfile
+import numpy as np
+
+
+__all__ = ['open_volume',
+           'create_volume',
+           'iter_slabs',
+           'process_slabs',
+           'process_layers']
+
+
+def open_volume(path, mode='r'):
+    """
+    Opens a .npy file as memory-mapped array, only the parts that are accessed are read from disk
+
+    Parameters
+    ----------
+    path : path of the .npy file
+    mode : 'r' read-only, 'r+' read and write, 'c' copy-on-write
+    """
+    return np.load(path, mmap_mode=mode)
+
+
+def create_volume(path, shape, dtype):
+    """
+    Creates a .npy file filled with zeros and returns it as memory-mapped array
+    """
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=tuple(shape))
+
+
+def _release(array):
+    """ drops the pages of a memory-mapped array from the memory of the process, they are read again on access.
+    Copy-on-write arrays keep their pages, dropping them would discard the changes """
+    if isinstance(array, np.memmap) and array.mode != 'c' and hasattr(mmap, 'MADV_DONTNEED'):
+        base = getattr(array, '_mmap', None)
+        if base is not None and not base.closed:
+            base.madvise(mmap.MADV_DONTNEED)
+
+
+def iter_slabs(shape, slab_size, axis=2, halo=0):
+    """
+    Splits an array into slabs of slab_size cells along axis
+
+    Yields
+    ------
+    read : index of the slab including halo cells on both sides (cut at the array boundary)
+    inner : index of the slab without the halo, relative to read
+    write : index of the slab without the halo in the array
+    """
+    n = shape[axis]
+    for start in range(0, n, slab_size):
+        stop = min(start + slab_size, n)
+        lo = max(start - halo, 0)
+        hi = min(stop + halo, n)
+
+        read = [slice(None)] * len(shape)
+        inner = [slice(None)] * len(shape)
+        write = [slice(None)] * len(shape)
+        read[axis] = slice(lo, hi)
+        inner[axis] = slice(start - lo, stop - lo)
+        write[axis] = slice(start, stop)
+        yield tuple(read), tuple(inner), tuple(write)
+
+
+def process_slabs(function, array, out, axis=2, halo=0, chunk_bytes=2**26):
+    """
+    Applies function to an array slab by slab and writes the results into out,
+    so memory-mapped arrays larger than the memory are processed with a bounded footprint.
+    Each slab is read with halo cells on both sides, analyses looking at direct neighbours need a halo of 1.
+
+    Slabs are sized so that the slab, its result and one intermediate array of the dtype of out
+    take about chunk_bytes, and the pages of memory-mapped arrays are dropped after each slab.
+    Slabs along axis 0 of a C-ordered array are contiguous in the file. Slabs along other axes are strided:
+    when a row along the last axis is shorter than a page, every slab touches every page, and the file is read
+    about array.nbytes / chunk_bytes times, see process_layers for functions that need whole layers.
+
+    Parameters
+    ----------
+    function : function taking a slab of array and returning a result of the same shape
+    array : numpy array or np.memmap
+    out : numpy array or np.memmap with the shape of array
+    axis : axis along which the array is split
+    halo : amount of cells added to both sides of each slab
+    chunk_bytes : approximate size of the slabs read into memory
+
+    Returns
+    -------
+    out
+    """
+    layer_bytes = array.size // max(array.shape[axis], 1) * (array.itemsize + 2 * out.itemsize)
+    slab_size = max(1, chunk_bytes // max(layer_bytes, 1) - 2 * halo)
+
+    for read, inner, write in iter_slabs(array.shape, slab_size, axis, halo):
+        slab = array[read]
+        if isinstance(array, np.memmap):
+            # load the slab once instead of paging the file for every access
+            slab = np.array(slab)
+        out[write] = function(slab)[inner]
+        if isinstance(out, np.memmap):
+            out.flush()
+        _release(array)
+        _release(out)
+    return out
+
+
+def _layer_major_shape(shape):
+    return (shape[2], shape[0], shape[1])
+
+
+def _transpose_blocks(source, target, to_layers, chunk_bytes):
+    """ copies a 3D array into target with its last axis moved to the front (to_layers) or back again,
+    in blocks of whole x rows, so both arrays are read and written once """
+    nx, ny, nz = target.shape if not to_layers else source.shape
+    block = max(1, chunk_bytes // (ny * nz * (source.itemsize + target.itemsize)))
+    for x0 in range(0, nx, block):
+        x1 = min(x0 + block, nx)
+        if to_layers:
+            target[:, x0:x1, :] = np.moveaxis(np.asarray(source[x0:x1]), 2, 0)
+        else:
+            target[x0:x1] = np.moveaxis(np.asarray(source[:, x0:x1, :]), 0, 2)
+        if isinstance(target, np.memmap):
+            target.flush()
+        _release(source)
+        _release(target)
+
+
+def _scratch_dir(*arrays):
+    """ directory of the first memory-mapped file, temporary files of its size may not fit into /tmp """
+    for array in arrays:
+        filename = getattr(array, 'filename', None)
+        if filename is not None:
+            return os.path.dirname(os.path.abspath(filename))
+    return None
+
+
+def process_layers(function, array, out, chunk_bytes=2**26, tmp_dir=None):
+    """
+    Applies a 2D function to every XY layer array[:, :, z] of a 3D array and writes the results into out[:, :, z].
+
+    The layers of a C-ordered file are strided, so memory-mapped arrays are first copied block by block
+    into a temporary .npy file with the layers along the first axis, where every slab of layers is contiguous,
+    and memory-mapped results are copied back the same way. Each file is read and written about three times,
+    instead of once per slab with slabs along the last axis.
+
+    Parameters
+    ----------
+    function : function taking a 2D layer of array and returning a result of the same shape
+    array : 3D numpy array or np.memmap
+    out : numpy array or np.memmap with the shape of array
+    chunk_bytes : approximate size of the slabs read into memory
+    tmp_dir : directory of the temporary files, by default the directory of out or array if they are
+              memory-mapped files
+
+    Returns
+    -------
+    out
+    """
+    if not isinstance(array, np.memmap) and not isinstance(out, np.memmap):
+        for z in range(array.shape[2]):
+            out[:, :, z] = function(array[:, :, z])
+        return out
+
+    def slab_function(slab):
+        values = np.empty(slab.shape, dtype=out.dtype)
+        for z in range(slab.shape[0]):
+            values[z] = function(slab[z])
+        return values
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir or _scratch_dir(out, array)) as directory:
+        shape = _layer_major_shape(array.shape)
+        if isinstance(array, np.memmap):
+            layers = create_volume(os.path.join(directory, 'array.npy'), shape, array.dtype)
+            _transpose_blocks(array, layers, True, chunk_bytes)
+        else:
+            layers = np.moveaxis(array, 2, 0)
+        if isinstance(out, np.memmap):
+            out_layers = create_volume(os.path.join(directory, 'out.npy'), shape, out.dtype)
+        else:
+            # writes go straight into out
+            out_layers = np.moveaxis(out, 2, 0)
+
+        process_slabs(slab_function, layers, out_layers, axis=0, chunk_bytes=chunk_bytes)
+        if isinstance(out, np.memmap):
+            _transpose_blocks(out_layers, out, False, chunk_bytes)
+        # close the temporary files before their directory is removed
+        del layers, out_layers
+    return out
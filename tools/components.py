@@ -0,0 +1,114 @@
+import numpy as np
+from ._jit import jit
+
+
+__all__ = ['label_components',
+           'component_sizes']
+
+
+@jit(nopython=True)
+def _find(parent, i):
+    # path halving
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+@jit(nopython=True)
+def _label_components(free, offsets, labels):
+    """ union-find over the free cells of a 3D array, every cell is joined with its already visited neighbours,
+    then the roots are numbered in scan order. Returns the amount of components """
+    nx, ny, nz = free.shape
+    parent = np.arange(free.size)
+    for x in range(nx):
+        for y in range(ny):
+            for z in range(nz):
+                if not free[x, y, z]:
+                    continue
+                i = (x * ny + y) * nz + z
+                for k in range(offsets.shape[0]):
+                    px = x + offsets[k, 0]
+                    py = y + offsets[k, 1]
+                    pz = z + offsets[k, 2]
+                    if px < 0 or px >= nx or py < 0 or py >= ny or pz < 0 or pz >= nz or not free[px, py, pz]:
+                        continue
+                    a = _find(parent, i)
+                    b = _find(parent, (px * ny + py) * nz + pz)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+
+    # roots are the smallest index of their component, so they are numbered before their cells are reached
+    free_1D = free.reshape(-1)
+    labels_1D = labels.reshape(-1)
+    n = 0
+    for i in range(free.size):
+        if not free_1D[i]:
+            continue
+        root = _find(parent, i)
+        if root == i:
+            labels_1D[i] = n
+            n += 1
+        else:
+            labels_1D[i] = labels_1D[root]
+    return n
+
+
+def _offsets(ndim, connectivity):
+    """ offsets of the neighbours visited before a cell in scan order, as 3D offsets """
+    if connectivity is None:
+        connectivity = 8 if ndim == 2 else 26
+    if ndim == 2 and connectivity not in (4, 8) or ndim == 3 and connectivity not in (6, 18, 26):
+        raise Exception('connectivity has to be 4 or 8 for 2D and 6, 18 or 26 for 3D arrays!!')
+    offsets = []
+    for x in (-1, 0, 1):
+        for y in (-1, 0, 1):
+            for z in ((-1, 0, 1) if ndim == 3 else (0,)):
+                if (x, y, z) >= (0, 0, 0):
+                    continue
+                # 4 and 6 face, 8 and 18 face and edge, 26 all neighbours
+                order = abs(x) + abs(y) + abs(z)
+                if connectivity in (4, 6) and order > 1 or connectivity == 18 and order > 2:
+                    continue
+                offsets.append((x, y, z))
+    return np.array(offsets, dtype=np.int64)
+
+
+def label_components(obstacle_map, connectivity=None):
+    """
+    Connected components of the void cells of a 2D or 3D array
+
+    Parameters
+    ----------
+    obstacle_map : 2D or 3D numpy array with non-zero values (-1, 1 or True) for obstacles
+    connectivity : 4 or 8 for 2D (default 8, the moves of Shortestpath),
+                   6, 18 or 26 for 3D (default 26)
+
+    Returns
+    -------
+    labels : int64 numpy array with the component (0 to n-1, in scan order) of every void cell, -1 for obstacles
+    n : amount of components
+    """
+    obstacle_map = np.asarray(obstacle_map)
+    if obstacle_map.ndim not in (2, 3):
+        raise Exception('array has to be 2D or 3D!!')
+    offsets = _offsets(obstacle_map.ndim, connectivity)
+    free = np.ascontiguousarray(obstacle_map == 0)
+    labels = np.full(obstacle_map.shape, -1, dtype=np.int64)
+    if free.ndim == 2:
+        n = _label_components(free[:, :, np.newaxis], offsets, labels[:, :, np.newaxis])
+    else:
+        n = _label_components(free, offsets, labels)
+    return labels, n
+
+
+def component_sizes(labels, n=None):
+    """
+    Amount of cells of every component of label_components
+
+    Returns
+    -------
+    1D int64 numpy array with the size of components 0 to n-1
+    """
+    labels = labels[labels >= 0]
+    return np.bincount(labels, minlength=0 if n is None else n)
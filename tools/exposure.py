@@ -0,0 +1,77 @@
+import itertools
+import numpy as np
+from .shadow_Bresenham import analyse_shadow_Bresenham_sorted
+from .neighbors import facade_bitmask
+
+
+__all__ = ['FACE_NORMALS',
+           'exposed_faces',
+           'facade_exposure']
+
+
+# outward normals of the 6 voxel faces: -x, +x, -y, +y, -z, +z, in the order of the facade_bitmask bits
+FACE_NORMALS = np.array([
+    (-1, 0, 0),
+    (1, 0, 0),
+    (0, -1, 0),
+    (0, 1, 0),
+    (0, 0, -1),
+    (0, 0, 1)
+], dtype=np.float64)
+
+
+def exposed_faces(voxel_space):
+    """
+    returns a boolean array of shape (*voxel_space.shape, 6) marking the faces of solid voxels
+    that touch a void voxel or the boundary of the array, in the order of FACE_NORMALS
+    """
+    bitmask = facade_bitmask(voxel_space)
+    faces = np.empty(bitmask.shape + (6,), dtype=bool)
+    for i in range(6):
+        np.bitwise_and(bitmask, 1 << i, out=faces[..., i], casting='unsafe')
+    return faces
+
+
+def facade_exposure(voxel_space, light_vectors, weights=None, out=None):
+    """
+    Accumulates cosine weighted direct exposure for every exposed face of the solid voxels
+
+    For every light vector the voxels in shadow are computed once, then each exposed face
+    that is lit and facing the light receives weight * cos(angle between normal and light).
+
+    Parameters
+    ----------
+    voxel_space : 3D numpy array with 0 for void and 1 for solid voxels
+    light_vectors : iterable of vectors (3 floats) pointing in the direction of the light
+    weights : iterable of floats, one per light vector (e.g. hours), defaults to 1
+    out : optional float numpy array of shape (*voxel_space.shape, 6) the exposure is added to
+
+    Returns
+    -------
+    exposure : float32 numpy array of shape (*voxel_space.shape, 6), faces ordered as FACE_NORMALS
+    """
+    solid = voxel_space > 0
+    faces = exposed_faces(solid)
+    if out is None:
+        exposure = np.zeros(faces.shape, dtype=np.float32)
+    else:
+        exposure = out
+
+    if weights is None:
+        weights = itertools.repeat(1.0)
+
+    for vec, weight in zip(light_vectors, weights):
+        vec = np.asarray(vec, dtype=np.float64)
+        cosines = FACE_NORMALS @ (-vec / np.linalg.norm(vec))
+        if not np.any(cosines > 0):
+            continue
+
+        lit = analyse_shadow_Bresenham_sorted(solid, vec)
+        np.logical_not(lit, out=lit)
+        np.logical_and(lit, solid, out=lit)
+
+        for i in np.flatnonzero(cosines > 0):
+            np.add(exposure[..., i], weight * cosines[i], out=exposure[..., i],
+                   where=np.logical_and(lit, faces[..., i]))
+
+    return exposure
@@ -0,0 +1,238 @@
+import heapq
+import numpy as np
+from ._jit import jit
+from .traversal import _voxel_step
+from .traversal import traverse_rays
+
+
+__all__ = ['geodesic_distance',
+           'any_angle_path',
+           'rasterize_path']
+
+
+# 8 neighbours and their step lengths
+_OFFSETS = np.array([(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)], dtype=np.int64)
+_STEPS = np.hypot(_OFFSETS[:, 0], _OFFSETS[:, 1])
+
+
+@jit(nopython=True)
+def _line_of_sight(blocked, x0, y0, x1, y1):
+    """ True if the segment between the centres of two cells only crosses free cells.
+    Segments through the corner of a blocked cell are blocked as well """
+    step_x, delta_x, t_x = _voxel_step(float(x1 - x0))
+    step_y, delta_y, t_y = _voxel_step(float(y1 - y0))
+    x, y = x0, y0
+    while x != x1 or y != y1:
+        if t_x < t_y:
+            x += step_x
+            t_x += delta_x
+        elif t_y < t_x:
+            y += step_y
+            t_y += delta_y
+        else:
+            if blocked[x + step_x, y] or blocked[x, y + step_y]:
+                return False
+            x += step_x
+            y += step_y
+            t_x += delta_x
+            t_y += delta_y
+        if blocked[x, y]:
+            return False
+    return True
+
+
+@jit(nopython=True)
+def _eikonal_update(a, b, h):
+    """ solution t of ((t - a) / h)^2 + ((t - b) / h)^2 = 1 using the smaller values only if needed """
+    if abs(a - b) < h:
+        return 0.5 * (a + b + np.sqrt(2.0 * h * h - (a - b) ** 2))
+    return min(a, b) + h
+
+
+@jit(nopython=True)
+def _known_min(known, distance, x0, y0, x1, y1):
+    """ smaller known distance of two cells, np.inf if none is known or inside the grid """
+    nx, ny = known.shape
+    value = np.inf
+    if 0 <= x0 < nx and 0 <= y0 < ny and known[x0, y0]:
+        value = distance[x0, y0]
+    if 0 <= x1 < nx and 0 <= y1 < ny and known[x1, y1]:
+        value = min(value, distance[x1, y1])
+    return value
+
+
+@jit(nopython=True)
+def _fast_marching(blocked, cost, sources, distance):
+    """ fast marching solution of |grad T| = cost, first order upwind differences along the axes
+    and along the diagonals (multistencil), which roughly halves the error in diagonal directions """
+    nx, ny = blocked.shape
+    known = np.zeros(blocked.shape, dtype=np.bool_)
+    heap = [(0.0, np.int64(0), np.int64(0))]
+    heap.pop()
+    for i in range(sources.shape[0]):
+        x, y = sources[i, 0], sources[i, 1]
+        if not blocked[x, y]:
+            distance[x, y] = 0.0
+            heapq.heappush(heap, (0.0, x, y))
+
+    while len(heap) > 0:
+        d, x, y = heapq.heappop(heap)
+        if known[x, y]:
+            continue
+        known[x, y] = True
+        for k in range(-1, 2):
+            for l in range(-1, 2):
+                px = x + k
+                py = y + l
+                if px < 0 or px >= nx or py < 0 or py >= ny or known[px, py] or blocked[px, py]:
+                    continue
+                f = cost[px, py]
+                t = _eikonal_update(_known_min(known, distance, px - 1, py, px + 1, py),
+                                    _known_min(known, distance, px, py - 1, px, py + 1), f)
+                t = min(t, _eikonal_update(_known_min(known, distance, px - 1, py - 1, px + 1, py + 1),
+                                           _known_min(known, distance, px - 1, py + 1, px + 1, py - 1),
+                                           f * np.sqrt(2.0)))
+                if t < distance[px, py]:
+                    distance[px, py] = t
+                    heapq.heappush(heap, (t, px, py))
+
+
+@jit(nopython=True)
+def _theta_star(blocked, sources, goal_x, goal_y, offsets, steps, distance, parents):
+    """ Theta* from one or many sources: a cell's parent is the grandparent if both see each other.
+    Runs until the goal is settled, or over the whole grid for a goal of -1 """
+    nx, ny = blocked.shape
+    heap = [(0.0, np.int64(0), np.int64(0))]
+    heap.pop()
+    for i in range(sources.shape[0]):
+        x, y = sources[i, 0], sources[i, 1]
+        if not blocked[x, y]:
+            distance[x, y] = 0.0
+            parents[x, y, 0] = x
+            parents[x, y, 1] = y
+            heapq.heappush(heap, (0.0, x, y))
+
+    while len(heap) > 0:
+        d, x, y = heapq.heappop(heap)
+        if d > distance[x, y]:
+            continue
+        if x == goal_x and y == goal_y:
+            break
+        px, py = parents[x, y, 0], parents[x, y, 1]
+        for k in range(offsets.shape[0]):
+            nbr_x = x + offsets[k, 0]
+            nbr_y = y + offsets[k, 1]
+            if nbr_x < 0 or nbr_x >= nx or nbr_y < 0 or nbr_y >= ny or blocked[nbr_x, nbr_y]:
+                continue
+            if _line_of_sight(blocked, px, py, nbr_x, nbr_y):
+                new_distance = distance[px, py] + np.sqrt((nbr_x - px) ** 2 + (nbr_y - py) ** 2)
+                new_x, new_y = px, py
+            elif _line_of_sight(blocked, x, y, nbr_x, nbr_y):
+                new_distance = d + steps[k]
+                new_x, new_y = x, y
+            else:
+                # diagonal step around the corner of an obstacle
+                continue
+            if new_distance < distance[nbr_x, nbr_y]:
+                distance[nbr_x, nbr_y] = new_distance
+                parents[nbr_x, nbr_y, 0] = new_x
+                parents[nbr_x, nbr_y, 1] = new_y
+                heapq.heappush(heap, (new_distance, nbr_x, nbr_y))
+
+
+def _sources(sources):
+    return np.ascontiguousarray(np.reshape(sources, (-1, 2)), dtype=np.int64)
+
+
+def geodesic_distance(obstacle_map, sources, cost_map=None, method='fast_marching'):
+    """
+    Walking distance field from one or many source cells around obstacles,
+    without the up to 8% overestimation of 8 connected grid paths
+
+    Parameters
+    ----------
+    obstacle_map : 2D numpy array with non-zero values (-1, 1 or True) for obstacles
+    sources : (row, col) index or (n, 2) integer numpy array of source cells
+    cost_map : optional 2D float numpy array with the walking cost per unit length of each cell,
+               only used by 'fast_marching'
+    method : 'fast_marching' solves the eikonal equation |grad T| = cost (first order, axis and diagonal stencils),
+             'any_angle' follows Theta* paths with straight segments between visible cells
+
+    Returns
+    -------
+    distance : 2D float numpy array with the distance to the closest source, -1 for obstacles and unreachable cells
+    """
+    blocked = np.ascontiguousarray(obstacle_map != 0)
+    if blocked.ndim != 2:
+        raise Exception('array has to be 2D!!')
+    sources = _sources(sources)
+    distance = np.full(blocked.shape, np.inf)
+
+    if method == 'fast_marching':
+        if cost_map is None:
+            cost = np.ones(blocked.shape)
+        else:
+            cost = np.ascontiguousarray(cost_map, dtype=np.float64)
+            if cost.shape != blocked.shape:
+                raise Exception('cost_map has to have the same shape as obstacle_map!!')
+        _fast_marching(blocked, cost, sources, distance)
+    elif method == 'any_angle':
+        if cost_map is not None:
+            raise Exception('cost_map is only supported by fast_marching!!')
+        parents = np.full((*blocked.shape, 2), -1, dtype=np.int64)
+        _theta_star(blocked, sources, -1, -1, _OFFSETS, _STEPS, distance, parents)
+    else:
+        raise Exception('method has to be fast_marching or any_angle!!')
+
+    distance[distance == np.inf] = -1
+    return distance
+
+
+def any_angle_path(obstacle_map, start, end):
+    """
+    Theta* any-angle path between two cells: straight segments between cell centres
+    that see each other instead of zig-zagging 8 connected steps
+
+    Parameters
+    ----------
+    obstacle_map : 2D numpy array with non-zero values (-1, 1 or True) for obstacles
+    start, end : (row, col) indices of the start and end cell
+
+    Returns
+    -------
+    waypoints : (n, 2) integer numpy array with the (row, col) corners of the path from start to end,
+                empty if end cannot be reached
+    length : length of the path, -1 if end cannot be reached
+    """
+    blocked = np.ascontiguousarray(obstacle_map != 0)
+    if blocked.ndim != 2:
+        raise Exception('array has to be 2D!!')
+    end = tuple(int(i) for i in end)
+    distance = np.full(blocked.shape, np.inf)
+    parents = np.full((*blocked.shape, 2), -1, dtype=np.int64)
+    _theta_star(blocked, _sources(start), end[0], end[1], _OFFSETS, _STEPS, distance, parents)
+
+    if distance[end] == np.inf:
+        return np.zeros((0, 2), dtype=np.int64), -1.0
+
+    waypoints = [end]
+    while tuple(parents[waypoints[-1]]) != waypoints[-1]:
+        waypoints.append(tuple(int(i) for i in parents[waypoints[-1]]))
+    return np.array(waypoints[::-1], dtype=np.int64), float(distance[end])
+
+
+def rasterize_path(waypoints, shape):
+    """
+    Cells crossed by the segments of a path
+
+    Returns
+    -------
+    2D boolean numpy array with True for the cells crossed by the path
+    """
+    visited = np.zeros(shape, dtype=np.bool_)
+    if len(waypoints) == 0:
+        return visited
+    visited[tuple(waypoints[0])] = True
+    if len(waypoints) > 1:
+        traverse_rays(None, waypoints[:-1], np.diff(waypoints, axis=0), lengths=1.0, visited=visited)
+    return visited
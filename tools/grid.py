@@ -1,37 +1,160 @@
 import numpy as np
+from .neighbors import facade_bitmask
+from .neighbors import count_facades
+from .neighbors import to_obstacle_map
+from .distances import calculate_distance_from_solids2D
+from .shortest_path import Shortestpath
+from .hierarchical import HierarchicalPath
 
 
 __all__ = ['Grid']
 
 
 class Grid:
-    """ 2D or 3D voxel space """
+    """ 2D or 3D voxel space
 
-    def __init__(self, voxel_map):
+    Stores the occupancy as a boolean array (1 byte per cell) or bit-packed (1 bit per cell)
+    and lazily computes and caches derived arrays, so chained analyses on the same model
+    do not compute shared intermediates twice. Every change of the occupancy increments
+    the version counter and invalidates the cached arrays.
+
+    Attributes
+    ----------
+    obstacle_map : 2D or 3D boolean numpy array
+            True for solid and False for void cells
+    packed : Boolean
+            store the occupancy bit-packed with np.packbits
+    """
+
+    def __init__(self, voxel_map, packed=False):
+        self.packed = packed
+        self.version = 0
+        self._cache = {}
+        self._shape = None
         self._obstacle_map = None
         self.obstacle_map = voxel_map
-        
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def ndim(self):
+        return len(self._shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self._shape))
+
     @property
     def obstacle_map(self):
+        if self.packed:
+            # a fresh array, in-place changes are not stored
+            unpacked = np.unpackbits(self._obstacle_map, count=self.size)
+            return unpacked.view(np.bool_).reshape(self._shape)
         return self._obstacle_map
-    
+
     @obstacle_map.setter
     def obstacle_map(self, voxel_map):
         if voxel_map.ndim > 3 or voxel_map.ndim < 2:
             raise Exception('array has to be 2D or 3D!!')
         else:
-            # convert any input into array of 0 and 1
-            voxel_map = voxel_map > 0
-            voxel_map = voxel_map * 1
-            self._obstacle_map = voxel_map
-    
+            # convert any input into array of False and True
+            voxel_map = np.asarray(voxel_map) > 0
+            self._shape = voxel_map.shape
+            if self.packed:
+                self._obstacle_map = np.packbits(voxel_map.ravel())
+            else:
+                self._obstacle_map = voxel_map
+            self.touch()
+
+    @property
+    def nbytes(self):
+        return self._obstacle_map.nbytes
+
+    def __setitem__(self, index, value):
+        obstacle_map = self.obstacle_map
+        obstacle_map[index] = np.asarray(value) > 0
+        if self.packed:
+            self._obstacle_map = np.packbits(obstacle_map.ravel())
+        self.touch()
+
+    def __getitem__(self, index):
+        return self.obstacle_map[index]
+
+    def touch(self):
+        """ increment the version after the occupancy changed in place, invalidating cached arrays """
+        self.version += 1
+
+    def cached(self, key, compute):
+        """
+        Returns the derived product stored under key for the current version,
+        computing it with compute() if it is missing or outdated.
+        Cached numpy arrays are read-only.
+        """
+        version, value = self._cache.get(key, (None, None))
+        if version != self.version:
+            value = compute()
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+            self._cache[key] = (self.version, value)
+        return value
+
+    def clear_cache(self):
+        self._cache.clear()
+
     @property
     def visible_cells(self):
-        pass
+        """ indices of the void cells """
+        return self.cached('visible_cells', lambda: np.argwhere(~self.obstacle_map))
 
     @property
     def invisible_cells(self):
-        pass
+        """ indices of the solid cells """
+        return self.cached('invisible_cells', lambda: np.argwhere(self.obstacle_map))
+
+    @property
+    def facade_bitmask(self):
+        """ exposed faces of every solid cell as bits, see facade_bitmask """
+        return self.cached('facade_bitmask', lambda: facade_bitmask(self.obstacle_map))
+
+    @property
+    def facade_counts(self):
+        """ amount of exposed faces of every solid cell """
+        return self.cached('facade_counts', lambda: count_facades(None, self.facade_bitmask))
+
+    @property
+    def distance_field(self):
+        """ distance of every void cell to the closest solid cell, per XY layer for 3D grids """
+        return self.cached('distance_field', self._distance_field)
+
+    def _distance_field(self):
+        obstacle_map = self.obstacle_map
+        if self.ndim == 2:
+            return calculate_distance_from_solids2D(obstacle_map)
+        values = np.zeros(self._shape)
+        for z in range(self._shape[2]):
+            values[:, :, z] = calculate_distance_from_solids2D(obstacle_map[:, :, z])
+        return values
+
+    @property
+    def neighbors_table(self):
+        """ 8 neighbour cells' 1D keys of every cell of a 2D grid, see Shortestpath.get_1D_neighbors """
+        return self.shortest_path.nbarr
+
+    @property
+    def shortest_path(self):
+        """ Shortestpath of a 2D grid, holding its neighbour table """
+        if self.ndim != 2:
+            raise NotImplementedError
+        return self.cached('shortest_path', lambda: Shortestpath(to_obstacle_map(self.obstacle_map)))
+
+    def hierarchical_path(self, cluster_size=32):
+        """ HierarchicalPath of a 2D grid, the abstraction is built once per cluster size """
+        if self.ndim != 2:
+            raise NotImplementedError
+        return self.cached(('hierarchical_path', cluster_size),
+                           lambda: HierarchicalPath(to_obstacle_map(self.obstacle_map), cluster_size))
 
 
 if __name__ == '__main__':
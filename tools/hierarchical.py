@@ -0,0 +1,402 @@
+import heapq
+import numpy as np
+from ._jit import jit
+from .neighbors import to_obstacle_map
+from .instrument import phase
+from .instrument import count
+
+
+__all__ = ['HierarchicalPath']
+
+
+# the 8 moves of Shortestpath and their costs
+_OFFSETS = np.array([(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)], dtype=np.int64)
+_WEIGHTS = np.array([1.4, 1, 1.4, 1, 1.4, 1, 1.4, 1])
+
+
+@jit(nopython=True)
+def _block_search(blocked, x0, y0, x1, y1, sx, sy, offsets, weights, dist):
+    """ Dijkstra from (sx, sy) restricted to the block [x0, x1) x [y0, y1), dist has the shape of the block """
+    ny = y1 - y0
+    dist[sx - x0, sy - y0] = 0.0
+    heap = [(0.0, np.int64((sx - x0) * ny + sy - y0))]
+    while len(heap) > 0:
+        d, cell = heapq.heappop(heap)
+        x = cell // ny + x0
+        y = cell % ny + y0
+        if d > dist[x - x0, y - y0]:
+            continue
+        for k in range(offsets.shape[0]):
+            nbr_x = x + offsets[k, 0]
+            nbr_y = y + offsets[k, 1]
+            if nbr_x < x0 or nbr_x >= x1 or nbr_y < y0 or nbr_y >= y1 or blocked[nbr_x, nbr_y]:
+                continue
+            new_dist = d + weights[k]
+            if new_dist < dist[nbr_x - x0, nbr_y - y0]:
+                dist[nbr_x - x0, nbr_y - y0] = new_dist
+                heapq.heappush(heap, (new_dist, np.int64((nbr_x - x0) * ny + nbr_y - y0)))
+
+
+@jit(nopython=True)
+def _corridor_search(blocked, slots, cluster_size, sx, sy, gx, gy, offsets, weights, dist, pred):
+    """ Dijkstra from (sx, sy) to (gx, gy) through the clusters with a slot >= 0 only. dist and pred are
+    (slots, cluster_size, cluster_size) arrays, so the memory depends on the corridor, pred holds 1D keys """
+    nx, ny = blocked.shape
+    cs = cluster_size
+    start = sx * ny + sy
+    dist[slots[sx // cs, sy // cs], sx % cs, sy % cs] = 0.0
+    pred[slots[sx // cs, sy // cs], sx % cs, sy % cs] = start
+    heap = [(0.0, np.int64(start))]
+    while len(heap) > 0:
+        d, cell = heapq.heappop(heap)
+        x = cell // ny
+        y = cell % ny
+        if d > dist[slots[x // cs, y // cs], x % cs, y % cs]:
+            continue
+        if x == gx and y == gy:
+            break
+        for k in range(offsets.shape[0]):
+            nbr_x = x + offsets[k, 0]
+            nbr_y = y + offsets[k, 1]
+            if nbr_x < 0 or nbr_x >= nx or nbr_y < 0 or nbr_y >= ny or blocked[nbr_x, nbr_y]:
+                continue
+            slot = slots[nbr_x // cs, nbr_y // cs]
+            if slot < 0:
+                continue
+            new_dist = d + weights[k]
+            if new_dist < dist[slot, nbr_x % cs, nbr_y % cs]:
+                dist[slot, nbr_x % cs, nbr_y % cs] = new_dist
+                pred[slot, nbr_x % cs, nbr_y % cs] = cell
+                heapq.heappush(heap, (new_dist, np.int64(nbr_x * ny + nbr_y)))
+
+
+@jit(nopython=True)
+def _abstract_search(indptr, indices, weights, seeds, seed_dist, goal_dist, dist, pred, touched):
+    """ Dijkstra on the abstract graph from the start cell's nodes to the end cell's nodes.
+    The nodes whose dist changed are written to touched, so only they have to be reset afterwards.
+    Returns the last node of the shortest route, its total length (-1 and inf if there is none)
+    and the amount of touched nodes """
+    heap = [(0.0, np.int64(0))]
+    heap.pop()
+    n_touched = 0
+    for i in range(seeds.shape[0]):
+        if seed_dist[i] < dist[seeds[i]]:
+            if dist[seeds[i]] == np.inf:
+                touched[n_touched] = seeds[i]
+                n_touched += 1
+            dist[seeds[i]] = seed_dist[i]
+            pred[seeds[i]] = seeds[i]
+            heapq.heappush(heap, (seed_dist[i], np.int64(seeds[i])))
+
+    best_node = -1
+    best = np.inf
+    while len(heap) > 0:
+        d, node = heapq.heappop(heap)
+        if d >= best:
+            break
+        if d > dist[node]:
+            continue
+        if d + goal_dist[node] < best:
+            best = d + goal_dist[node]
+            best_node = node
+        for j in range(indptr[node], indptr[node + 1]):
+            nbr = indices[j]
+            new_dist = d + weights[j]
+            if new_dist < dist[nbr]:
+                if dist[nbr] == np.inf:
+                    touched[n_touched] = nbr
+                    n_touched += 1
+                dist[nbr] = new_dist
+                pred[nbr] = node
+                heapq.heappush(heap, (new_dist, np.int64(nbr)))
+    return best_node, best, n_touched
+
+
+def _border_transitions(a, b, cluster_size, long_run=6):
+    """
+    Crossings of a border between two lines of cells a (one side) and b (other side),
+    as (position in a, position in b, cost). Every run of straight crossings within one pair of clusters
+    gets one transition in its middle, runs of long_run or more cells also at both ends.
+    Diagonal crossings only if neither end has a straight crossing,
+    diagonal crossings into the next pair of clusters (corners) always
+    """
+    transitions = []
+    straight = a & b
+    n = straight.size
+    start = None
+    for i in range(n + 1):
+        run = i < n and straight[i] and (start is None or i // cluster_size == start // cluster_size)
+        if start is not None and not run:
+            for k in sorted({start, (start + i - 1) // 2, i - 1} if i - start >= long_run else {(start + i - 1) // 2}):
+                transitions.append((k, k, 1.0))
+            start = None
+        if i < n and straight[i] and start is None:
+            start = i
+
+    for i in np.flatnonzero(a):
+        for j in (i - 1, i + 1):
+            if j < 0 or j >= n or not b[j]:
+                continue
+            if i // cluster_size != j // cluster_size or not (b[i] or a[j]):
+                transitions.append((i, j, 1.4))
+    return transitions
+
+
+class HierarchicalPath:
+    """Hierarchical pathfinding (HPA*) over the 8 neighbour moves of Shortestpath
+
+    The grid is split into square clusters. Transition cells on the cluster borders and the distances
+    between the transitions of every cluster form a small abstract graph, which is searched instead of the grid.
+    The route is refined into cells with a search restricted to the clusters it passes, so a query costs about
+    the amount of clusters along the route instead of the size of the grid. Routes are near-optimal:
+    they are the shortest paths within the corridor of clusters the abstract route found.
+    The search buffers over all nodes and clusters are kept between queries and only their touched entries
+    are reset, so queries on one instance must not run concurrently.
+
+    Attributes
+    ----------
+    obstacle_map : 2D numpy array
+        -1 for collision and 0 for ground, boolean or unsigned maps (True or >0 for collision) are converted
+    cluster_size : int
+        edge length of the clusters in cells, larger clusters give a smaller abstract graph but slower refinement
+    nodes : 1D numpy array
+        1D keys (x*nY + y) of the transition cells, sorted by cluster
+
+    Methods
+    ----------
+    find_path(startIndex, endIndex)
+        1D keys of the path cells and length of the path
+    -
+    get_shortest_path(startIndex, endIndex, format=0)
+        Map with the path between two cells, as Shortestpath.get_shortest_path
+    -
+    save(file)
+        Store the abstraction in a .npz file, HierarchicalPath.load(file) restores it
+    """
+
+    def __init__(self, obstacle_map, cluster_size=32):
+        if obstacle_map.dtype == np.bool_ or obstacle_map.dtype.kind == 'u':
+            obstacle_map = to_obstacle_map(obstacle_map)
+        if obstacle_map.ndim != 2:
+            raise Exception('array has to be 2D!!')
+        self.obstacle_map = obstacle_map
+        self.cluster_size = int(cluster_size)
+        self._blocked = np.ascontiguousarray(obstacle_map < 0)
+        with phase('abstraction'):
+            self._build()
+
+    @property
+    def shape(self):
+        return self.obstacle_map.shape
+
+    def _buffers(self):
+        """ abstract search and corridor buffers, allocated on the first query """
+        if getattr(self, '_dist', None) is None:
+            self._to_goal = np.full(self.nodes.size, np.inf)
+            self._dist = np.full(self.nodes.size, np.inf)
+            self._pred = np.full(self.nodes.size, -1, dtype=np.int64)
+            self._touched = np.empty(self.nodes.size, dtype=np.int64)
+            self._slots = np.full((-(-self.shape[0] // self.cluster_size), -(-self.shape[1] // self.cluster_size)),
+                                  -1, dtype=np.int64)
+        return self._to_goal, self._dist, self._pred, self._touched, self._slots
+
+    def _cluster(self, x, y):
+        """ cluster index of cells """
+        n_clusters_y = -(-self.shape[1] // self.cluster_size)
+        return (x // self.cluster_size) * n_clusters_y + y // self.cluster_size
+
+    def _cluster_bounds(self, cluster):
+        n_clusters_y = -(-self.shape[1] // self.cluster_size)
+        x0 = (cluster // n_clusters_y) * self.cluster_size
+        y0 = (cluster % n_clusters_y) * self.cluster_size
+        return x0, y0, min(x0 + self.cluster_size, self.shape[0]), min(y0 + self.cluster_size, self.shape[1])
+
+    def _build(self):
+        nX, nY = self.shape
+        free = ~self._blocked
+        cs = self.cluster_size
+
+        # transitions across the borders between clusters, as pairs of 1D keys
+        pairs = []
+        for x in range(cs, nX, cs):
+            for i, j, cost in _border_transitions(free[x - 1, :], free[x, :], cs):
+                pairs.append(((x - 1) * nY + i, x * nY + j, cost))
+        for y in range(cs, nY, cs):
+            for i, j, cost in _border_transitions(free[:, y - 1], free[:, y], cs):
+                pairs.append((i * nY + y - 1, j * nY + y, cost))
+        pairs = np.array(pairs, dtype=np.float64).reshape(-1, 3)
+
+        # nodes sorted by cluster, node_indptr[c]:node_indptr[c + 1] are the nodes of cluster c
+        cells = np.unique(pairs[:, :2].astype(np.int64))
+        clusters = self._cluster(cells // nY, cells % nY)
+        order = np.argsort(clusters, kind='stable')
+        self.nodes = cells[order]
+        n_clusters = -(-nX // cs) * -(-nY // cs)
+        self.node_indptr = np.searchsorted(clusters[order], np.arange(n_clusters + 1))
+
+        # inter-cluster edges in both directions
+        node_of = np.empty(cells.size, dtype=np.int64)
+        node_of[order] = np.arange(cells.size)
+        a = node_of[np.searchsorted(cells, pairs[:, 0].astype(np.int64))]
+        b = node_of[np.searchsorted(cells, pairs[:, 1].astype(np.int64))]
+        edges = [np.stack((a, b, pairs[:, 2]), axis=1), np.stack((b, a, pairs[:, 2]), axis=1)]
+
+        # intra-cluster edges from a search over the cluster from every node
+        for cluster in range(n_clusters):
+            first, last = self.node_indptr[cluster], self.node_indptr[cluster + 1]
+            if last - first < 2:
+                continue
+            x0, y0, x1, y1 = self._cluster_bounds(cluster)
+            members = self.nodes[first:last]
+            for u in range(first, last):
+                d = self._search_block(x0, y0, x1, y1, self.nodes[u])[members // nY - x0, members % nY - y0]
+                v = np.flatnonzero((d < np.inf) & (members != self.nodes[u]))
+                edges.append(np.stack((np.full(v.size, u), v + first, d[v]), axis=1))
+            count('abstraction searches', last - first)
+
+        edges = np.concatenate(edges)
+        self._set_graph(edges[:, 0].astype(np.int64), edges[:, 1].astype(np.int64), edges[:, 2])
+
+    def _set_graph(self, src, dst, weights):
+        """ abstract graph in CSR form """
+        order = np.argsort(src, kind='stable')
+        self.indptr = np.searchsorted(src[order], np.arange(self.nodes.size + 1))
+        self.indices = dst[order]
+        self.weights = weights[order]
+
+    def _search_block(self, x0, y0, x1, y1, cell):
+        """ distances from cell to the cells of the block [x0, x1) x [y0, y1) """
+        nY = self.shape[1]
+        dist = np.full((x1 - x0, y1 - y0), np.inf)
+        _block_search(self._blocked, x0, y0, x1, y1, cell // nY, cell % nY, _OFFSETS, _WEIGHTS, dist)
+        return dist
+
+    def _cluster_distances(self, cell):
+        """ distance from cell to the nodes of its cluster """
+        cluster = self._cluster(cell // self.shape[1], cell % self.shape[1])
+        first, last = self.node_indptr[cluster], self.node_indptr[cluster + 1]
+        x0, y0, x1, y1 = self._cluster_bounds(cluster)
+        dist = self._search_block(x0, y0, x1, y1, cell)
+        nodes = np.arange(first, last)
+        cells = self.nodes[first:last]
+        return nodes, dist[cells // self.shape[1] - x0, cells % self.shape[1] - y0]
+
+    def find_path(self, startIndex, endIndex):
+        """
+        Near-optimal path between two cells
+
+        Parameters
+        ----------
+        startIndex : 1D key of start cell (x*nY + y)
+        endIndex : 1D key of end cell
+
+        Returns
+        -------
+        path : 1D numpy array with the 1D keys of the path cells from start to end, empty if end cannot be reached
+        length : length of the path, -1 if end cannot be reached
+        """
+        startIndex, endIndex = int(startIndex), int(endIndex)
+        nY = self.shape[1]
+        if self._blocked.flat[startIndex] or self._blocked.flat[endIndex]:
+            return np.zeros(0, dtype=np.int64), -1.0
+
+        # clusters of the route over the abstract graph
+        start_cluster = self._cluster(startIndex // nY, startIndex % nY)
+        end_cluster = self._cluster(endIndex // nY, endIndex % nY)
+        to_goal, dist, pred, touched, _ = self._buffers()
+        with phase('abstract search'):
+            seeds, seed_dist = self._cluster_distances(startIndex)
+            goals, goal_dist = self._cluster_distances(endIndex)
+            to_goal[goals] = goal_dist
+            node, length, n_touched = _abstract_search(self.indptr, self.indices, self.weights,
+                                                       seeds, seed_dist, to_goal, dist, pred, touched)
+            route = [node] if node >= 0 else []
+            while route and pred[route[-1]] != route[-1]:
+                route.append(pred[route[-1]])
+            to_goal[goals] = np.inf
+            dist[touched[:n_touched]] = np.inf
+            pred[touched[:n_touched]] = -1
+        if node < 0 and start_cluster != end_cluster:
+            return np.zeros(0, dtype=np.int64), -1.0
+
+        count('abstract nodes', len(route))
+        cells = self.nodes[route]
+        corridor = np.unique(np.concatenate(([start_cluster, end_cluster], self._cluster(cells // nY, cells % nY))))
+
+        # shortest path within the corridor
+        with phase('refinement'):
+            path, length = self._search_corridor(corridor, startIndex, endIndex)
+        return path, length
+
+    def _search_corridor(self, corridor, startIndex, endIndex):
+        nY = self.shape[1]
+        cs = self.cluster_size
+        slots = self._buffers()[4]
+        slots.flat[corridor] = np.arange(corridor.size)
+        dist = np.full((corridor.size, cs, cs), np.inf)
+        pred = np.full((corridor.size, cs, cs), -1, dtype=np.int64)
+        try:
+            _corridor_search(self._blocked, slots, cs, startIndex // nY, startIndex % nY,
+                             endIndex // nY, endIndex % nY, _OFFSETS, _WEIGHTS, dist, pred)
+
+            def index(cell):
+                x, y = cell // nY, cell % nY
+                return slots[x // cs, y // cs], x % cs, y % cs
+
+            length = dist[index(endIndex)]
+            if length == np.inf:
+                return np.zeros(0, dtype=np.int64), -1.0
+            path = [endIndex]
+            while path[-1] != startIndex:
+                path.append(int(pred[index(path[-1])]))
+        finally:
+            slots.flat[corridor] = -1
+        return np.array(path[::-1], dtype=np.int64), float(length)
+
+    def get_shortest_path(self, startIndex, endIndex, format=0):
+        """
+        Path between two cells
+
+        Parameters
+        ----------
+        startIndex : 1D key of start cell
+        endIndex : 1D key of end cell
+        format : 0 for 1D numpy array / 1 for 2D numpy array
+
+        Returns
+        -------
+        obstacle_map with 1 for path cells, unchanged if endIndex cannot be reached from startIndex
+        """
+        shortestPath_map = self.obstacle_map.flatten()
+        shortestPath_map[self.find_path(startIndex, endIndex)[0]] += 1
+
+        if format == 0:
+            return shortestPath_map
+        elif format == 1:
+            return np.reshape(shortestPath_map, self.shape)
+
+    def save(self, file):
+        """
+        Store the abstraction (obstacle map bit-packed, nodes and abstract graph) in a .npz file
+        """
+        np.savez_compressed(file, shape=np.array(self.shape), cluster_size=self.cluster_size,
+                            blocked=np.packbits(self._blocked), nodes=self.nodes, node_indptr=self.node_indptr,
+                            indptr=self.indptr, indices=self.indices, weights=self.weights)
+
+    @classmethod
+    def load(cls, file):
+        """
+        HierarchicalPath stored with save, without rebuilding the abstraction
+        """
+        with np.load(file) as data:
+            self = cls.__new__(cls)
+            shape = tuple(int(i) for i in data['shape'])
+            self.cluster_size = int(data['cluster_size'])
+            self._blocked = np.unpackbits(data['blocked'], count=shape[0] * shape[1]).view(np.bool_).reshape(shape)
+            self.obstacle_map = to_obstacle_map(self._blocked)
+            self.nodes = data['nodes']
+            self.node_indptr = data['node_indptr']
+            self.indptr = data['indptr']
+            self.indices = data['indices']
+            self.weights = data['weights']
+        return self
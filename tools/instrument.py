@@ -0,0 +1,101 @@
+import time
+from contextlib import contextmanager
+from contextlib import nullcontext
+from collections import defaultdict
+
+
+__all__ = ['Instrument',
+           'instrument',
+           'get_instrument']
+
+
+class Instrument:
+    """ Collects progress, wall time per phase and counters of the running analyses
+
+    Attributes
+    ----------
+    phases : dict {phase name: seconds}
+    counters : dict {counter name: amount}
+    callback : optional function(task, done, total) called on progress, total is None if unknown
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.phases = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.tasks = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def progress(self, task, done, total):
+        self.tasks[task] = (done, total)
+        if self.callback is not None:
+            self.callback(task, done, total)
+
+    def report(self):
+        """ phase timings, counters and progress as text """
+        lines = ['%-24s %10.4f s' % (name, seconds) for name, seconds in sorted(self.phases.items())]
+        lines += ['%-24s %10d' % (name, amount) for name, amount in sorted(self.counters.items())]
+        lines += ['%-24s %10d / %s' % (task, done, '?' if total is None else total)
+                  for task, (done, total) in sorted(self.tasks.items())]
+        return '\n'.join(lines)
+
+
+_active = None
+_no_phase = nullcontext()
+
+
+@contextmanager
+def instrument(callback=None):
+    """
+    Context manager instrumenting the analyses run inside of it
+
+    Parameters
+    ----------
+    callback : optional function(task, done, total) called whenever a unit of work
+               (a viewpoint, a source cell, a light vector) is done
+
+    Examples
+    --------
+    >>> with instrument(lambda task, done, total: print(task, done, total)) as inst:
+    ...     analyse_centrality2D(array)
+    >>> print(inst.report())
+    """
+    global _active
+    previous = _active
+    _active = Instrument(callback)
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+def get_instrument():
+    """ the active Instrument or None """
+    return _active
+
+
+def phase(name):
+    """ context manager adding its wall time to a phase, does nothing without active Instrument """
+    if _active is None:
+        return _no_phase
+    return _active.phase(name)
+
+
+def count(name, amount=1):
+    if _active is not None:
+        _active.count(name, amount)
+
+
+def progress(task, done, total):
+    if _active is not None:
+        _active.progress(task, done, total)
@@ -5,6 +5,13 @@ __license__    = 'MIT License'
 __email__      = ['<dbt@arch.ethz.ch>']
 
 import numpy as np
+from .traversal import traverse_rays
+from .neighbors import count_neighbors
+from .neighbors import facade_bitmask
+from .neighbors import to_obstacle_map
+from .instrument import phase
+from .instrument import count
+from .instrument import progress
 
 
 __all__ = ['Isovist']
@@ -18,11 +25,15 @@ class Isovist:
     Attributes 
     ----------
     obstacle_map : 2D numpy array 
-            -1 for collision and 0 for ground
+            -1 for collision and 0 for ground, boolean or unsigned maps (True or >0 for collision) are converted to int8
     
     radius : float number 
             reaching area defined by visibility limits
     
+    dtype : numpy dtype
+            dtype of the isovist maps, e.g. np.float32 to keep fractional percentages.
+            Defaults to the dtype of obstacle_map
+    
     Methods
     -------
     isovist_from_point(startIndex, youAreHere=False, format=0)
@@ -32,8 +43,11 @@ class Isovist:
             Create a 1D or 2D isovist numpy array with visibility percentage of each cell
     """
 
-    def __init__(self, obstacle_map, radius=None):
+    def __init__(self, obstacle_map, radius=None, dtype=None):
+        if obstacle_map.dtype == np.bool_ or obstacle_map.dtype.kind == 'u':
+            obstacle_map = to_obstacle_map(obstacle_map)
         self.obstacle_map = obstacle_map
+        self.dtype = obstacle_map.dtype if dtype is None else np.dtype(dtype)
         if not radius:
             self.radius = obstacle_map.size
         else:
@@ -77,21 +91,23 @@ class Isovist:
         return neighbors
 
     def neighbors_map(self):
-        neighbors_map = np.ones(self.obstacle_map.shape, dtype=np.int) * -1
-
-        for cell in self.invisible_cells:
-            facade_count = 0
-            neighbors = self.cell_neighbors(cell)
-            for nbr in neighbors:
-                if self.obstacle_map[nbr[0], nbr[1]] == -1:
-                    facade_count += 1
-            neighbors_map[cell[0], cell[1]] = facade_count
-        
+        """
+        Amount of collision neighbors (4 connected) for each collision cell, -1 for ground cells
+        """
+        obstacles = self.obstacle_map < 0
+        neighbors_map = count_neighbors(obstacles).astype(np.int64)
+        neighbors_map[~obstacles] = -1
         return neighbors_map
 
     def facade_map(self):
         return 4 - self.neighbors_map()
 
+    def facade_bitmask(self):
+        """
+        Exposed faces of each collision cell as bits FACE_WEST, FACE_EAST, FACE_SOUTH and FACE_NORTH, 0 for ground cells
+        """
+        return facade_bitmask(self.obstacle_map < 0)
+
     def isovist_from_point(self, startIndex, youAreHere=False, format=0):
         """
         Create a 2D or 1D isovist numpy array from a starting point
@@ -106,11 +122,13 @@ class Isovist:
         -------
         isovist_area : Isovist Map with -1 collision, 0 non-visible ground, 1 visible ground
         """
-        isovist_area = np.copy(self.obstacle_map)
+        isovist_area = self.obstacle_map.astype(self.dtype)
         
         # Shoot rays
-        for xEdg, yEdg in zip(self.edges[0], self.edges[1]):
-            self.visibility_ray(startIndex, (yEdg, xEdg), isovist_area)
+        if not self.obstacle_map[startIndex[1], startIndex[0]] < 0:
+            visible = np.zeros(self.obstacle_map.shape, dtype=np.bool_)
+            self.cast_rays(startIndex, np.stack(self.edges, axis=1), self.obstacle_map < 0, visible)
+            isovist_area[visible] = 1
         
         # Highlight pov
         if youAreHere:
@@ -122,6 +140,35 @@ class Isovist:
         elif format == 1:
                 return isovist_area
     
+    def iter_isovist_map(self, collision=False):
+        """
+        Visibility percentage of one cell after the other
+        
+        Parameters
+        ----------
+        collision : False for ground cells (as isovist_map) / True for collision cells (as isovist_map_collision)
+        
+        Yields
+        ------
+        (row, col) index of the cell and its visibility percentage
+        """
+        cells = self.invisible_cells if collision else self.visible_cells
+        size = cells.size
+        edges = np.stack(self.edges, axis=1)
+        blocked = self.obstacle_map < 0
+
+        # Shoot rays and count enlightened cells
+        povMap = np.zeros(self.obstacle_map.shape, dtype=np.bool_)
+        for i, [startX, startY] in enumerate(cells):
+            with phase('ray casting'):
+                self.cast_rays((startY, startX), edges, blocked, povMap)
+            count('rays cast', edges.shape[0])
+            progress('isovist_map', i + 1, len(cells))
+
+            # Percentage of visibility per cell
+            yield (startX, startY), (np.count_nonzero(povMap) / size) * 100
+            povMap[:] = False
+
     def isovist_map_collision(self, format=0):
         """
         Create a 1D or 2D isovist numpy array with visibility percentage for each cell
@@ -136,20 +183,9 @@ class Isovist:
         isovist_map : Isovist for each cell in a 1D or 2D numpy array 
         """
         
-        isovist_map = np.copy(self.obstacle_map)
-        size = self.invisible_cells.size
-
-        # Shoot rays and count enlightened cells
-        povMap = np.zeros(self.obstacle_map.shape, dtype=np.int)
-        for [startX, startY] in self.invisible_cells:
-            self.obstacle_map[startX, startY] = 0
-            for xEdg, yEdg in zip(self.edges[0], self.edges[1]):
-                self.visibility_ray((startY, startX), (yEdg, xEdg), povMap)    
-
-            # Percentage of visibility per cell
-            isovist_map[startX, startY] = (np.count_nonzero(povMap) / size) * 100
-            povMap = np.zeros(self.obstacle_map.shape, dtype=np.int)
-            self.obstacle_map[startX, startY] = -1
+        isovist_map = self.obstacle_map.astype(self.dtype)
+        for index, percentage in self.iter_isovist_map(collision=True):
+            isovist_map[index] = percentage
 
         # Export options
         if format == 0:
@@ -171,17 +207,9 @@ class Isovist:
         isovist_map : Isovist for each cell in a 1D or 2D numpy array 
         """
         
-        isovist_map = np.copy(self.obstacle_map)
-
-        # Shoot rays and count enlightened cells
-        povMap = np.zeros(self.obstacle_map.shape, dtype=np.int)
-        for [startX, startY] in self.visible_cells:
-            for xEdg, yEdg in zip(self.edges[0], self.edges[1]):
-                self.visibility_ray((startY, startX), (yEdg, xEdg), povMap)
-
-            # Percentage of visibility per cell
-            isovist_map[startX, startY] = (np.count_nonzero(povMap) / self.visible_cells.size) * 100
-            povMap = np.zeros(self.obstacle_map.shape, dtype=np.int)
+        isovist_map = self.obstacle_map.astype(self.dtype)
+        for index, percentage in self.iter_isovist_map(collision=False):
+            isovist_map[index] = percentage
 
         # Export options
         if format == 0:
@@ -190,9 +218,29 @@ class Isovist:
             return isovist_map
 
     
+    def cast_rays(self, startIndex, edges, blocked, visibility_map):
+        """
+        Shoot rays from a starting point to every edge cell using the shared voxel traversal
+        
+        Parameters
+        ----------
+        startIndex : (x,y) coordinates of rays' starting point
+        edges : (n,2) numpy array with the array indices of the edge cells
+        blocked : 2D boolean numpy array with True for collision cells
+        visibility_map : 2D boolean numpy array to be updated
+
+        Returns
+        -------
+        visibility_map updated with the shooted rays
+        """
+        x, y = startIndex
+        origins = np.broadcast_to((y, x), edges.shape)
+        traverse_rays(blocked, origins, edges - (y, x), lengths=1.0, radius=self.radius, visited=visibility_map)
+        return visibility_map
+
     def visibility_ray(self, startIndex, endIndex, visibility_map):
         """
-        Bresenham's Line Algorithm using np array to detect collision and radius for maximum visibility
+        Amanatides-Woo traversal between two cells to detect collision and radius for maximum visibility
         
         Parameters
         ----------
@@ -204,69 +252,10 @@ class Isovist:
         -------
         visibility_map updated with the shooted ray
         """
-        
-        # Setup initial conditions
         x1, y1 = startIndex
         x2, y2 = endIndex
-        dx = x2 - x1
-        dy = y2 - y1
-        
-        # Determine how steep the line is
-        is_steep = abs(dy) > abs(dx)
-        
-        # Rotate line
-        if is_steep:
-                x1, y1 = y1, x1
-                x2, y2 = y2, x2
-        
-                # Recalculate differentials
-                dx = abs(x2 - x1)
-                dy = abs(y2 - y1)
-                
-                # Calculate error
-                error = int(dx / 2.0)
-                ystep = 1 if y1 < y2 else -1
-                
-                # Inverse orientation
-                incr = 1 if x1 < x2 else -1
-                
-                # Iterate over bounding box generating points between start and end
-                y = y1
-                for x in range(x1, x2 + incr, incr):
-                        if not self.obstacle_map[x,y] < 0:
-                            if not (x1-x)**2 + (y1-y)**2 - self.radius**2 >= 0:
-                                visibility_map[x,y] = 1
-                                error -= abs(dy) 
-                                if error < 0:
-                                        y += ystep
-                                        error += dx
-                            else:
-                                break
-                        else:
-                                break
-        else:
-                # Recalculate differentials
-                dx = abs(x2 - x1)
-                dy = abs(y2 - y1)
-                
-                # Calculate error
-                error = int(dx / 2.0)
-                ystep = 1 if y1 < y2 else -1
-                
-                # Inverse orientation
-                incr = 1 if x1 < x2 else -1
-                
-                # Iterate over bounding box generating points between start and end
-                y = y1
-                for x in range(x1, x2 + incr, incr):
-                        if not self.obstacle_map[y,x] < 0:
-                            if not (x1-x)**2 + (y1-y)**2 - self.radius**2 >= 0:
-                                visibility_map[y,x] = 1
-                                error -= abs(dy) 
-                                if error < 0:
-                                        y += ystep
-                                        error += dx
-                            else:
-                                break
-                        else:
-                                break
\ No newline at end of file
+        if self.obstacle_map[y1, x1] < 0:
+            return visibility_map
+        visible = traverse_rays(self.obstacle_map < 0, (y1, x1), (y2 - y1, x2 - x1), lengths=1.0, radius=self.radius)[0]
+        visibility_map[visible] = 1
+        return visibility_map
@@ -0,0 +1,99 @@
+import numpy as np
+from ._jit import jit, prange
+from .traversal import _ray3D
+from .traversal import traverse_rays
+
+
+__all__ = ['ray_directions3D',
+           'isovist_from_point3D',
+           'isovist_count_map3D']
+
+
+def ray_directions3D(resolution):
+    """
+    Spherical ray set: directions from the centre to every surface cell of a cube
+    with a half size of resolution cells, the 3D counterpart of the edge rays used by Isovist
+
+    Returns
+    -------
+    directions : (n, 3) float numpy array
+    """
+    r = max(int(np.ceil(resolution)), 1)
+    coords = np.arange(-r, r + 1)
+    directions = np.stack(np.meshgrid(coords, coords, coords, indexing='ij'), axis=-1).reshape(-1, 3)
+    on_surface = np.max(np.abs(directions), axis=1) == r
+    return directions[on_surface].astype(np.float64)
+
+
+def _default_resolution(shape, radius):
+    resolution = max(shape)
+    if radius is not None:
+        resolution = min(resolution, radius)
+    return resolution
+
+
+def isovist_from_point3D(obstacle_map, view_point, radius=None, resolution=None):
+    """
+    3D isovist (viewshed) from a voxel
+
+    Parameters
+    ----------
+    obstacle_map : 3D numpy array with True or >0 for solid voxels
+    view_point : (x, y, z) index of the viewpoint
+    radius : maximum viewing distance in voxels, None for unlimited
+    resolution : half size of the cube defining the spherical ray set, defaults to the size of the array
+
+    Returns
+    -------
+    visible : 3D boolean numpy array with True for visible void voxels
+    """
+    blocked = obstacle_map > 0
+    if resolution is None:
+        resolution = _default_resolution(blocked.shape, radius)
+
+    directions = ray_directions3D(resolution)
+    origins = np.broadcast_to(np.asarray(view_point, dtype=np.int64), directions.shape)
+    visible, _ = traverse_rays(blocked, origins, directions, radius=radius,
+                               include_origin=not blocked[tuple(view_point)])
+    return visible
+
+
+@jit(nopython=True, parallel=True)
+def _isovist_count_map3D(blocked, view_points, directions, radius_sq):
+    counts = np.zeros(view_points.shape[0], dtype=np.int64)
+    for i in prange(view_points.shape[0]):
+        x, y, z = view_points[i, 0], view_points[i, 1], view_points[i, 2]
+        visited = np.zeros(blocked.shape, dtype=np.bool_)
+        include_origin = not blocked[x, y, z]
+        count = 0
+        for j in range(directions.shape[0]):
+            count += _ray3D(blocked, True, x, y, z, directions[j, 0], directions[j, 1], directions[j, 2],
+                            np.inf, radius_sq, include_origin, visited, None)
+        counts[i] = count
+    return counts
+
+
+def isovist_count_map3D(obstacle_map, view_points, radius=None, resolution=None):
+    """
+    Number of visible void voxels for each of many viewpoints, computed in parallel
+
+    Parameters
+    ----------
+    obstacle_map : 3D numpy array with True or >0 for solid voxels
+    view_points : (n, 3) integer numpy array with the indices of the viewpoints,
+                  solid viewpoints (e.g. window voxels) look out of their own voxel
+    radius : maximum viewing distance in voxels, None for unlimited
+    resolution : half size of the cube defining the spherical ray set, defaults to the size of the array
+
+    Returns
+    -------
+    counts : (n,) numpy array with the number of visible void voxels per viewpoint
+    """
+    blocked = np.ascontiguousarray(obstacle_map > 0)
+    if resolution is None:
+        resolution = _default_resolution(blocked.shape, radius)
+
+    view_points = np.ascontiguousarray(np.reshape(view_points, (-1, 3)), dtype=np.int64)
+    directions = ray_directions3D(resolution)
+    radius_sq = np.inf if radius is None else float(radius) ** 2
+    return _isovist_count_map3D(blocked, view_points, directions, radius_sq)
@@ -1,7 +1,17 @@
 import numpy as np
 
 __all__ = ['get_neighbors2D',
-           'get_neighbors3D']
+           'get_neighbors3D',
+           'count_neighbors',
+           'facade_bitmask',
+           'count_facades',
+           'to_obstacle_map',
+           'FACE_WEST',
+           'FACE_EAST',
+           'FACE_SOUTH',
+           'FACE_NORTH',
+           'FACE_DOWN',
+           'FACE_UP']
 
 def get_neighbors2D(model_2d, row, col):
     """
@@ -79,4 +89,90 @@ def get_neighbors3D(model_3d, row, col, level):
 #     if shape is not None:
 #         valid = np.all((neighbours < np.array(shape)) & (neighbours >= 0), axis=1)
 #         neighbours = neighbours[valid]
-#     return neighbours
\ No newline at end of file
+#     return neighbours
+
+# bits of the exposed faces, x east, y north, z up
+FACE_WEST = 1    # -x
+FACE_EAST = 2    # +x
+FACE_SOUTH = 4   # -y
+FACE_NORTH = 8   # +y
+FACE_DOWN = 16   # -z
+FACE_UP = 32     # +z
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(64)], dtype=np.uint8)
+
+
+def _shifted_slices(ndim, axis):
+    """ slices of the lower and upper cells of every pair of face neighbours along an axis """
+    lower = [slice(None)] * ndim
+    upper = [slice(None)] * ndim
+    lower[axis] = slice(0, -1)
+    upper[axis] = slice(1, None)
+    return tuple(lower), tuple(upper)
+
+
+def to_obstacle_map(voxel_map):
+    """
+    Converts a voxel map (>0 for solid) into the obstacle map used by Isovist and Shortestpath:
+    an int8 array with -1 for solid and 0 for void cells, 1 byte per cell
+    """
+    obstacle_map = (np.asarray(voxel_map) > 0).view(np.int8)
+    return np.negative(obstacle_map, out=obstacle_map)
+
+
+def count_neighbors(array):
+    """
+    returns the amount of face connected neighbours (4 in 2d, 6 in 3d) that are solid (non zero)
+    for every cell of a 2D or 3D array, cells outside the array are not counted
+    """
+    if array.ndim > 3 or array.ndim < 2:
+        raise Exception('array has to be 2D or 3D!!')
+
+    solid = array != 0
+    counts = np.zeros(array.shape, dtype=np.uint8)
+    for axis in range(array.ndim):
+        lower, upper = _shifted_slices(array.ndim, axis)
+        counts[upper] += solid[lower]
+        counts[lower] += solid[upper]
+    return counts
+
+
+def facade_bitmask(array):
+    """
+    returns a uint8 array with a bit set for every face of a solid (>0) cell that touches
+    a void cell or the boundary of the array.
+    Bits: FACE_WEST (-x), FACE_EAST (+x), FACE_SOUTH (-y), FACE_NORTH (+y), FACE_DOWN (-z), FACE_UP (+z)
+    """
+    if array.ndim > 3 or array.ndim < 2:
+        raise Exception('array has to be 2D or 3D!!')
+
+    solid = array > 0
+    bitmask = np.zeros(array.shape, dtype=np.uint8)
+    exposed = np.empty(array.shape, dtype=bool)
+    for axis in range(array.ndim):
+        lower, upper = _shifted_slices(array.ndim, axis)
+        lower_bit, upper_bit = 1 << (2 * axis), 1 << (2 * axis + 1)
+
+        # faces towards -axis
+        exposed[:] = True
+        np.logical_not(solid[lower], out=exposed[upper])
+        np.logical_and(exposed, solid, out=exposed)
+        np.bitwise_or(bitmask, lower_bit, out=bitmask, where=exposed)
+
+        # faces towards +axis
+        exposed[:] = True
+        np.logical_not(solid[upper], out=exposed[lower])
+        np.logical_and(exposed, solid, out=exposed)
+        np.bitwise_or(bitmask, upper_bit, out=bitmask, where=exposed)
+    return bitmask
+
+
+def count_facades(array, bitmask=None):
+    """
+    returns the amount of exposed faces of every solid (>0) cell of a 2D or 3D array,
+    faces on the boundary of the array count as exposed.
+    An already computed facade_bitmask of the array can be passed to skip its computation
+    """
+    if bitmask is None:
+        bitmask = facade_bitmask(array)
+    return _POPCOUNT[bitmask]
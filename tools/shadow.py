@@ -1,7 +1,12 @@
 import numpy as np
+from ._jit import jit
+from .traversal import _voxel_step
+from .traversal import traverse_rays
 
-__all__ = ['shadow_from_sun_ray']
+__all__ = ['shadow_from_sun_ray',
+           'analyse_shadow_traversal']
 
+@jit(nopython=True)
 def distanceSqr(x1, y1, z1, x2, y2, z2):
     dX = x2 - x1
     dY = y2 - y1
@@ -9,12 +14,12 @@ def distanceSqr(x1, y1, z1, x2, y2, z2):
     return dX * dX + dY * dY + dZ * dZ
 
 
+@jit(nopython=True)
 def dot(x1, y1, z1, x2, y2, z2):
     return x1 * x2 + y1 * y2 + z1 * z2
 
-# all vector calculations could be switched to numpy?
-
 
+@jit(nopython=True)
 def dist_to_ray_sq(px, py, pz, x, y, z, vx, vy, vz):
     c2 = dot(vx, vy, vz, vx, vy, vz)  # can be precalculated
     dx = px - x
@@ -30,24 +35,89 @@ def dist_to_ray_sq(px, py, pz, x, y, z, vx, vy, vz):
     return distanceSqr(px, py, pz, cx, cy, cz)
 
 
-def shadow_from_sun_ray(voxel_space, light_vec):
-    shadow_space = np.zeros(voxel_space.shape)
-    #diag= 0.5**(1.0/3)
+@jit(nopython=True)
+def _shadow_from_sun_ray(voxel_space, light_vec, shadow_space):
+    vx, vy, vz = light_vec[0], light_vec[1], light_vec[2]
+    nx, ny, nz = voxel_space.shape
     diag = 0.25
-    it = np.nditer(voxel_space, flags=['multi_index'])
-    for x in it:
-        if x == 1:  # solid
-            x1, y1, z1 = it.multi_index[0], it.multi_index[1], it.multi_index[2]
-            if shadow_space[it.multi_index] == 0:  # not yet shadow
-                it2 = np.nditer(voxel_space, flags=['multi_index'])
-                for t in it2:
-                    if t == 1:  # another solid
-                        if shadow_space[it2.multi_index] == 0:  # not yet shadow
-                            x, y, z = it2.multi_index[0], it2.multi_index[1], it2.multi_index[2]
-                            if (x != x1 or y != y1 or z != z1):  # don't check yourself
-                                dist = dist_to_ray_sq(
-                                    x, y, z, x1, y1, z1, *light_vec)
-                                if (dist >= 0 and dist < diag):  # does the shadow ray hit this cell?
-                                    shadow_space[it2.multi_index] = 1
+
+    step_x, delta_x, first_x = _voxel_step(vx)
+    step_y, delta_y, first_y = _voxel_step(vy)
+    step_z, delta_z, first_z = _voxel_step(vz)
+
+    for x1 in range(nx):
+        for y1 in range(ny):
+            for z1 in range(nz):
+                if voxel_space[x1, y1, z1] != 1:  # solid
+                    continue
+                if shadow_space[x1, y1, z1] != 0:  # not yet shadow
+                    continue
+
+                # Amanatides-Woo walk through every voxel the shadow ray passes.
+                # A voxel centre closer than sqrt(diag) = 0.5 to the ray lies inside
+                # the voxel the ray crosses, so no candidate is missed.
+                x, y, z = x1, y1, z1
+                t_x, t_y, t_z = first_x, first_y, first_z
+                while True:
+                    if t_x < t_y and t_x < t_z:
+                        x += step_x
+                        t_x += delta_x
+                    elif t_y < t_z:
+                        y += step_y
+                        t_y += delta_y
+                    else:
+                        z += step_z
+                        t_z += delta_z
+
+                    if x < 0 or y < 0 or z < 0 or x >= nx or y >= ny or z >= nz:
+                        break
+
+                    if voxel_space[x, y, z] == 1 and shadow_space[x, y, z] == 0:
+                        dist = dist_to_ray_sq(x, y, z, x1, y1, z1, vx, vy, vz)
+                        if (dist >= 0 and dist < diag):  # does the shadow ray hit this cell?
+                            shadow_space[x, y, z] = 1
     return shadow_space
 
+
+def shadow_from_sun_ray(voxel_space, light_vec):
+    """
+    Exact shadow of solid voxels: a solid voxel is in shadow if the ray cast along light_vec
+    from the centre of a solid voxel in front of it passes closer than 0.5 to its centre.
+
+    Parameters
+    ----------
+    voxel_space : 3D numpy array with 0 for void and 1 for solid voxels
+    light_vec : vector (3 floats) pointing in the direction of the light
+
+    Returns
+    -------
+    shadow_space : 3D numpy array with 1 for solid voxels in shadow, 0 for the rest
+    """
+    shadow_space = np.zeros(voxel_space.shape)
+    light_vec = np.asarray(light_vec, dtype=np.float64)
+    if not np.any(light_vec):
+        return shadow_space
+    return _shadow_from_sun_ray(voxel_space, light_vec, shadow_space)
+
+
+def analyse_shadow_traversal(voxel_space, light):
+    """
+    Shadow of solid voxels based on the shared Amanatides-Woo ray traversal:
+    a solid voxel is in shadow if the light ray leaving any other solid voxel's centre passes through it.
+
+    Parameters
+    ----------
+    voxel_space : 3D numpy array with 0 for void and 1 for solid voxels
+    light : vector (3 floats) pointing in the direction of the light
+
+    Returns
+    -------
+    boolean numpy array with True for solid voxels in shadow
+    """
+    solid = voxel_space > 0
+    shadows = np.zeros(voxel_space.shape, dtype=np.bool_)
+    indices = np.argwhere(solid)
+    directions = np.broadcast_to(np.asarray(light, dtype=np.float64), indices.shape)
+    traverse_rays(None, indices, directions, include_origin=False, visited=shadows)
+
+    return np.logical_and(solid, shadows, out=shadows)
@@ -1,5 +1,5 @@
 import numpy as np
-from numba import jit
+from ._jit import jit
 
 
 __all__ = ['analyse_shadow_Bresenham_sorted']
@@ -4,12 +4,54 @@ __copyright__  = 'Copyright 2021 / Digital Building Technologies DBT / ETH Zuric
 __license__    = 'MIT License'
 __email__      = ['<dbt@arch.ethz.ch>']
 
+import heapq
+from collections import OrderedDict
 import numpy as np
+from ._jit import jit
+from .neighbors import to_obstacle_map
+from .components import label_components
+from .components import component_sizes
+from .instrument import phase
+from .instrument import count
+from .instrument import progress
 
 
 __all__ = ['Shortestpath']
 
 
+@jit(nopython=True)
+def _dijkstra_cost(nbarr, weights, cost, startIndexes, distArr, predArr):
+  """
+  Dijkstra's algorithm with a binary heap for real valued edge costs:
+  step length x mean cost of the two cells. All start cells are seeded at distance 0.
+  Returns the amount of heap pushes
+  """
+  heap = [(0.0, np.int64(startIndexes[0]))]
+  for i in range(startIndexes.shape[0]):
+    distArr[startIndexes[i]] = 0
+    predArr[startIndexes[i]] = startIndexes[i]
+    if i > 0:
+      heapq.heappush(heap, (0.0, np.int64(startIndexes[i])))
+  pushes = startIndexes.shape[0]
+  
+  while len(heap) > 0:
+    d, cellIndex = heapq.heappop(heap)
+    # outdated entry, the cell was reached cheaper meanwhile
+    if d > distArr[cellIndex]:
+      continue
+    for j in range(nbarr.shape[1]):
+      nbr = nbarr[cellIndex, j]
+      if nbr < 0:
+        continue
+      newDist = d + weights[j] * 0.5 * (cost[cellIndex] + cost[nbr])
+      if newDist < distArr[nbr]:
+        distArr[nbr] = newDist
+        predArr[nbr] = cellIndex
+        heapq.heappush(heap, (newDist, np.int64(nbr)))
+        pushes += 1
+  return pushes
+
+
 class Shortestpath:
   """Graph analytic's class to compute betweenness centrality using numpy
   (https://en.wikipedia.org/wiki/Betweenness_centrality)
@@ -19,7 +61,20 @@ class Shortestpath:
   Attributes 
   ----------
   obstacle_map : 2D numpy array 
-      -1 for collision and 0 for ground
+      -1 for collision and 0 for ground, assigning a new map clears the cache.
+      Boolean or unsigned maps (True or >0 for collision) are converted to int8
+  cache_size : int
+      amount of minimal spanning trees kept in memory (least recently used are dropped first), 0 to disable
+  max_bytes : int
+      memory the cached spanning trees may take, a tree is distArr and predArr of the whole map,
+      so large maps keep fewer trees. None for no limit
+  dtype : numpy dtype
+      float dtype of the distances, np.float32 halves the memory traffic of the searches
+  index_dtype : numpy dtype
+      integer dtype of the neighbour table and the spanning trees, np.int32 for maps with less than 2**31 cells
+  cost_map : 2D float numpy array or None
+      traversal cost of each cell (stairs, slopes, congestion), the cost of a step is its length (1 or 1.4)
+      times the mean cost of both cells. np.inf blocks a cell. None for a cost of 1 everywhere
   
   Methods
   ----------
@@ -29,18 +84,109 @@ class Shortestpath:
   get_shortest_path(startIndex, endIndex, youAreHere=False, format=0)
       Shortest path between two cells
   -
+  get_nearest_source(sources, format=0)
+      Distance to and index of the nearest of many source cells
+  -
   get_centrality(format=0)
       Centrality map
   -
   get_traffic(format=0)
       Traffic map
+  -
+  cache_info()
+      Hits, misses and size of the spanning tree cache
+  -
+  get_components()
+      Connected component of every cell and size of every component
   """
   
 
-  def __init__(self, obstacle_map):
+  def __init__(self, obstacle_map, cache_size=16, dtype=np.float64, index_dtype=np.int64, cost_map=None,
+               max_bytes=2**28):
+    self.dtype = np.dtype(dtype)
+    self.index_dtype = np.dtype(index_dtype)
+    self.cache_size = cache_size
+    self.max_bytes = max_bytes
+    self._trees = OrderedDict()
+    self._tree_bytes = 0
+    self.hits = 0
+    self.misses = 0
+    self._cost_map = None
     self.obstacle_map = obstacle_map
+    self.cost_map = cost_map
+  
+  
+  @property
+  def cost_map(self):
+    return self._cost_map
+  
+  
+  @cost_map.setter
+  def cost_map(self, cost_map):
+    if cost_map is not None:
+      cost_map = np.asarray(cost_map, dtype=np.float64)
+      if cost_map.shape != self.obstacle_map.shape:
+        raise Exception('cost_map has to have the same shape as obstacle_map!!')
+      if np.any(cost_map < 0):
+        raise Exception('cost_map has to be >= 0!!')
+    self._cost_map = cost_map
+    self._components = None
+    self.clear_cache()
+  
+  
+  @property
+  def obstacle_map(self):
+    return self._obstacle_map
+  
+  
+  @obstacle_map.setter
+  def obstacle_map(self, obstacle_map):
+    if obstacle_map.dtype == np.bool_ or obstacle_map.dtype.kind == 'u':
+        obstacle_map = to_obstacle_map(obstacle_map)
+    self._obstacle_map = obstacle_map
+    self._components = None
     self.visible_cells = np.argwhere(obstacle_map==0)
-    self.nbarr = self.get_1D_neighbors()
+    with phase('neighbour build'):
+        self.nbarr = self.get_1D_neighbors()
+    self.clear_cache()
+  
+  
+  def clear_cache(self):
+    """
+    Drop all cached spanning trees, needed after the obstacle map was changed in place
+    """
+    self._trees.clear()
+    self._tree_bytes = 0
+  
+  
+  def cache_info(self):
+    """
+    Returns
+    -------
+    dict with hits, misses, size, maxsize, bytes and maxbytes of the spanning tree cache
+    """
+    return {'hits': self.hits, 'misses': self.misses, 'size': len(self._trees), 'maxsize': self.cache_size,
+            'bytes': self._tree_bytes, 'maxbytes': self.max_bytes}
+  
+  
+  def get_components(self):
+    """
+    Connected components of the ground cells under the 8 neighbour moves, cells with an infinite cost block.
+    Computed once per obstacle map and cost map
+    
+    Returns
+    -------
+    labels : 1D numpy array with the component of every cell, -1 for collision cells
+    sizes : 1D numpy array with the amount of cells of every component
+    """
+    if self._components is None:
+      blocked = self.obstacle_map < 0
+      if self._cost_map is not None:
+        blocked = blocked | np.isinf(self._cost_map)
+      with phase('components'):
+        labels, n = label_components(blocked, connectivity=8)
+      self._components = labels.ravel(), component_sizes(labels, n)
+    return self._components
   
   
   def indexFromXY(self, x, y, nY):
@@ -60,7 +206,7 @@ class Shortestpath:
     """
     adjacents = [(-1,-1), (-1,0), (-1,1), (0,1), (1,1), (1,0), (1,-1), (0,-1)]
     
-    nb = np.full((self.obstacle_map.size,8), -1, dtype=np.int)
+    nb = np.full((self.obstacle_map.size,8), -1, dtype=self.index_dtype)
     
     for [x,y] in self.visible_cells:
         index_1D = self.indexFromXY(x,y,self.obstacle_map.shape[1])
@@ -86,19 +232,78 @@ class Shortestpath:
     distArr : 1D or 2D numpy array with distances from start cell
     predArr : 1D or 2D numpy array with closest coordinates from start cell (minimal spanning tree)
     """
+    distArr, predArr = self._spanningtree(startIndex)
+    distArr = distArr.copy()
+    predArr = predArr.copy()
+    
+    # Highlight pov
+    if youAreHere:
+        distArr[startIndex] = np.inf
+    
+    if format == 0:
+        return distArr, predArr
+    
+    elif format == 1:
+        # Reshape (1D -> 2D) and Rewrite infinities (inf -> -1)
+        distArr = np.reshape(distArr, self.obstacle_map.shape)
+        
+        # Reshape (1D -> 2D) closest neighbor key from start cell
+        p = np.full((self.obstacle_map.size,2), -1, dtype=self.index_dtype)
+        for i, _ in enumerate(predArr):
+            if not _ < 0:
+                p[i] = [int(_/self.obstacle_map.shape[1]), int(_%self.obstacle_map.shape[1])]
+        p = np.reshape(p,(*self.obstacle_map.shape, 2))
+        
+        return distArr, p
+  
+  
+  def _spanningtree(self, startIndex):
+    """
+    Cached, read-only distArr and predArr (1D) of a start cell
+    """
+    key = int(startIndex)
+    if key in self._trees:
+        self._trees.move_to_end(key)
+        self.hits += 1
+        count('sssp cache hits')
+        return self._trees[key]
+    
+    self.misses += 1
+    with phase('sssp'):
+        tree = self._dijkstra(key)
+    nbytes = sum(arr.nbytes for arr in tree)
+    if self.cache_size > 0 and (self.max_bytes is None or nbytes <= self.max_bytes):
+        for arr in tree:
+            arr.setflags(write=False)
+        self._trees[key] = tree
+        self._tree_bytes += nbytes
+        while len(self._trees) > self.cache_size or self.max_bytes is not None and self._tree_bytes > self.max_bytes:
+            _, dropped = self._trees.popitem(last=False)
+            self._tree_bytes -= sum(arr.nbytes for arr in dropped)
+    return tree
+  
+  
+  def _dijkstra(self, startIndex):
+    """
+    distArr and predArr (1D) of one start cell, or of the nearest start cell for an array of them
+    """
+    if self._cost_map is not None:
+      return self._dijkstra_cost(np.atleast_1d(startIndex))
     
     # Vectorized shortest distance
-    distArr = np.where(self.obstacle_map.flatten() < 0, -1, np.full(self.obstacle_map.size, np.inf))
+    distArr = np.full(self.obstacle_map.size, np.inf, dtype=self.dtype)
+    distArr[self.obstacle_map.ravel() < 0] = -1
     distArr[startIndex] = 0
-    indexes = np.full((self.obstacle_map.size), -1, dtype=np.int)
-    predArr = np.full((self.obstacle_map.size), -1, dtype=np.int)
+    indexes = np.full((self.obstacle_map.size), -1, dtype=self.index_dtype)
+    predArr = np.full((self.obstacle_map.size), -1, dtype=self.index_dtype)
     
     check = np.where(distArr==0)[0]
     nNew = check.size
     indexes[0:nNew] = check
-    predArr[0:nNew] = check
+    predArr[check] = check
     endI = nNew
-    weights = [1.4, 1, 1.4, 1, 1.4, 1, 1.4, 1]
+    # in the dtype of distArr, so stored costs compare equal to computed ones
+    weights = np.array([1.4, 1, 1.4, 1, 1.4, 1, 1.4, 1], dtype=self.dtype)
     
     while nNew > 0:
         nNew = 0
@@ -114,31 +319,77 @@ class Shortestpath:
                             indexes[endI+nNew] = nbr
                             predArr[nbr] = cellIndex
                             nNew += 1
+        count('cells relaxed', nNew)
         
         indexes[0 : nNew] = indexes[endI : endI + nNew]
         endI = nNew
     
-    distArr = np.where(distArr == np.inf, -1, distArr)
+    distArr[distArr == np.inf] = -1
     
-    # Highlight pov
-    if youAreHere:
-        distArr[startIndex] = np.inf
+    return distArr, predArr
+  
+  
+  def _dijkstra_cost(self, startIndexes):
+    distArr = np.full(self.obstacle_map.size, np.inf)
+    predArr = np.full((self.obstacle_map.size), -1, dtype=self.index_dtype)
+    weights = np.array([1.4, 1, 1.4, 1, 1.4, 1, 1.4, 1])
+    
+    if startIndexes.size > 0:
+      pushes = _dijkstra_cost(self.nbarr, weights, self._cost_map.ravel(),
+                              startIndexes.astype(np.int64), distArr, predArr)
+      count('heap pushes', pushes)
+    
+    distArr[distArr == np.inf] = -1
+    distArr[self.obstacle_map.ravel() < 0] = -1
+    return distArr.astype(self.dtype, copy=False), predArr
+  
+  
+  def get_nearest_source(self, sources, format=0):
+    """
+    Multi-source Dijkstra: distance from every cell to the nearest source cell and which source it is,
+    e.g. the walking distance to the closest exit. All sources are searched at once,
+    in the time of a single get_minimal_spanningtree
     
-    if format == 0:
-        return distArr, predArr
+    Parameters
+    ----------
+    sources : 1D keys of the source cells, sources on collision cells are ignored
+    format : 0 for 1D numpy array / 1 for 2D numpy array
+    
+    Returns
+    -------
+    distArr : 1D or 2D numpy array with distances to the nearest source, -1 for collision and unreachable cells
+    sourceArr : 1D or 2D numpy array with the position in sources of the nearest source,
+                -1 for collision and unreachable cells
+    """
+    sources = np.atleast_1d(np.asarray(sources, dtype=self.index_dtype)).ravel()
+    seeds = sources[self.obstacle_map.ravel()[sources] == 0]
+    
+    if seeds.size == 0:
+      distArr = np.full(self.obstacle_map.size, -1, dtype=self.dtype)
+      predArr = np.full(self.obstacle_map.size, -1, dtype=self.index_dtype)
+    else:
+      with phase('sssp'):
+        distArr, predArr = self._dijkstra(seeds)
+    
+    # root of every tree by pointer jumping, sources are their own predecessor
+    root = predArr.astype(np.int64)
+    reached = root >= 0
+    while True:
+      nextRoot = root.copy()
+      nextRoot[reached] = root[root[reached]]
+      if np.array_equal(nextRoot, root):
+        break
+      root = nextRoot
+    
+    # first position of each source cell in sources
+    position = np.full(self.obstacle_map.size, -1, dtype=self.index_dtype)
+    position[sources[::-1]] = np.arange(sources.size, dtype=self.index_dtype)[::-1]
+    sourceArr = np.where(reached, position[root], -1).astype(self.index_dtype, copy=False)
     
+    if format == 0:
+      return distArr, sourceArr
     elif format == 1:
-        # Reshape (1D -> 2D) and Rewrite infinities (inf -> -1)
-        distArr = np.reshape(distArr, self.obstacle_map.shape)
-        
-        # Reshape (1D -> 2D) closest neighbor key from start cell
-        p = np.full((self.obstacle_map.size,2), -1, dtype=np.int)
-        for i, _ in enumerate(predArr):
-            if not _ < 0:
-                p[i] = [int(_/self.obstacle_map.shape[1]), int(_%self.obstacle_map.shape[1])]
-        p = np.reshape(p,(*self.obstacle_map.shape, 2))
-        
-        return distArr, p
+      return np.reshape(distArr, self.obstacle_map.shape), np.reshape(sourceArr, self.obstacle_map.shape)
   
   
   def get_shortest_path(self, startIndex, endIndex, youAreHere=False, format=0):
@@ -156,9 +407,9 @@ class Shortestpath:
     -------
     visibility_map updated with the shooted ray
     """
-    shortestPath_map = np.copy(self.obstacle_map.flatten())
+    shortestPath_map = self.obstacle_map.flatten()
     
-    pred = self.get_minimal_spanningtree(startIndex)[1]
+    pred = self._spanningtree(startIndex)[1]
     self.get_path(startIndex, endIndex, pred, shortestPath_map)
     
     # Export options
@@ -181,8 +432,12 @@ class Shortestpath:
     
     Returns
     -------
-    Update visible_map with 1 for path cells, 0 for ground and -1 for collision
+    Update visible_map with 1 for path cells, 0 for ground and -1 for collision,
+    unchanged if endIndex cannot be reached from startIndex
     """
+    if predArr[endIndex] < 0:
+        return
+    
     visible_map[endIndex] += 1
     v = predArr[endIndex]
     
@@ -192,26 +447,49 @@ class Shortestpath:
     visible_map[startIndex] += 1
   
   
-  def get_centrality(self, format=0):
+  def iter_centrality(self):
+    """
+    Centrality of one ground cell after the other
+    
+    Yields
+    ------
+    1D key of the cell and its mean distance to the other cells of its component,
+    0 for cells without reachable cells. Every cell is searched once, so the trees bypass the cache
+    """
+    # Ground cells
+    vCells = np.flatnonzero(self.obstacle_map.ravel()==0)
+    labels, sizes = self.get_components()
+    
+    for i, k in enumerate(vCells):
+      size = sizes[labels[k]] if labels[k] >= 0 else 1
+      if size > 1:
+        with phase('sssp'):
+          dist = self._dijkstra(k)[0]
+        with phase('accumulation'):
+          centrality = dist[dist > 0].sum() / (size - 1)
+      else:
+        centrality = 0.0
+      progress('centrality', i + 1, vCells.size)
+      yield k, centrality
+  
+  
+  def get_centrality(self, format=0, dtype=np.int64):
     """
     Return centrality map
     
     Parameters
     ----------
     format : 0 for 1D numpy array / 1 for 2D numpy array
+    dtype : dtype of the centrality map, a float dtype keeps the fractional part
     
     Returns
     -------
     centralityMap : 1D or 2D numpy array with centrality percentage for each cell
     """
-    centralityMap = np.zeros(self.obstacle_map.size, dtype=np.int)
-    
-    # Ground cells
-    vCells = np.argwhere(self.obstacle_map.flatten()==0).flatten()
+    centralityMap = np.zeros(self.obstacle_map.size, dtype=dtype)
     
-    for k in vCells:
-      dist = self.get_minimal_spanningtree(k)[0]
-      centralityMap[k] = dist[dist > 0].sum() / np.sum(dist > 0)
+    for k, centrality in self.iter_centrality():
+      centralityMap[k] = centrality
     
     if format == 0:
       return centralityMap
@@ -232,11 +510,19 @@ class Shortestpath:
     -------
     traffic_map updated from startIndex cell traffic
     """    
-    pred = self.get_minimal_spanningtree(startIndex)[1]
-    pr = np.concatenate(np.argwhere(pred > 0))
+    self._add_cell_traffic(startIndex, self._spanningtree(startIndex)[1], traffic_map)
+  
+  
+  def _add_cell_traffic(self, startIndex, pred, traffic_map):
+    """
+    Adds the paths of the spanning tree pred from startIndex to every reached cell to traffic_map
+    """
+    pr = np.flatnonzero(pred >= 0)
+    pr = pr[pr != startIndex]
     
-    for p in pr:
-        self.get_path(startIndex, p, pred, traffic_map)
+    with phase('accumulation'):
+      for p in pr:
+          self.get_path(startIndex, p, pred, traffic_map)
   
   
   def get_traffic(self, format=0):
@@ -252,14 +538,19 @@ class Shortestpath:
     trafficMap : 1D or 2D numpy array with traffic values
     """
     
-    trafficMap = np.zeros(self.obstacle_map.size,dtype=np.int)
+    trafficMap = np.zeros(self.obstacle_map.size,dtype=np.int64)
 
-    # Ground cells
-    vCells = np.argwhere(self.obstacle_map.flatten()==0).flatten()
-    
-    # Update traffic map
-    for k in vCells:
-        self.get_cell_traffic(k, trafficMap)
+    # Ground cells, cells alone in their component reach nothing
+    vCells = np.flatnonzero(self.obstacle_map.ravel()==0)
+    labels, sizes = self.get_components()
+    vCells = vCells[(labels[vCells] >= 0) & (sizes[labels[vCells]] > 1)]
+    
+    # Update traffic map, every cell is searched once, so the trees bypass the cache
+    for i, k in enumerate(vCells):
+        with phase('sssp'):
+          pred = self._dijkstra(k)[1]
+        self._add_cell_traffic(k, pred, trafficMap)
+        progress('traffic', i + 1, vCells.size)
     
     if format == 0:
       return trafficMap
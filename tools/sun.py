@@ -0,0 +1,135 @@
+import datetime
+import numpy as np
+
+
+__all__ = ['sun_position',
+           'iter_sun_vectors',
+           'sun_vectors']
+
+
+def _to_datetime64(time):
+    if isinstance(time, datetime.datetime):
+        time = time.replace(tzinfo=None)
+    return np.datetime64(time, 's')
+
+
+def sun_position(latitude, longitude, times, utc_offset=0):
+    """
+    Geometric sun position after the NOAA solar calculator (no refraction correction)
+
+    Parameters
+    ----------
+    latitude : latitude in degrees, north positive
+    longitude : longitude in degrees, east positive
+    times : datetime, numpy datetime64 or array of numpy datetime64 in local time
+    utc_offset : offset of the local time to UTC in hours (e.g. 1 for CET)
+
+    Returns
+    -------
+    azimuth : numpy array of azimuths in degrees, clockwise from north
+    altitude : numpy array of altitudes above the horizon in degrees
+    """
+    times = np.atleast_1d(np.asarray(times, dtype='datetime64[s]'))
+    seconds = (times - np.datetime64('1970-01-01T00:00:00', 's')).astype(np.float64)
+    seconds -= utc_offset * 3600.0
+
+    # julian century
+    T = (seconds / 86400.0 + 2440587.5 - 2451545.0) / 36525.0
+
+    L0 = np.radians((280.46646 + T * (36000.76983 + T * 0.0003032)) % 360)
+    M = np.radians(357.52911 + T * (35999.05029 - 0.0001537 * T))
+    e = 0.016708634 - T * (0.000042037 + 0.0000001267 * T)
+    C = np.radians(np.sin(M) * (1.914602 - T * (0.004817 + 0.000014 * T))
+                   + np.sin(2 * M) * (0.019993 - 0.000101 * T)
+                   + np.sin(3 * M) * 0.000289)
+    omega = np.radians(125.04 - 1934.136 * T)
+    apparent_longitude = L0 + C - np.radians(0.00569 + 0.00478 * np.sin(omega))
+
+    obliquity = 23 + (26 + (21.448 - T * (46.815 + T * (0.00059 - T * 0.001813))) / 60) / 60
+    obliquity = np.radians(obliquity + 0.00256 * np.cos(omega))
+    declination = np.arcsin(np.sin(obliquity) * np.sin(apparent_longitude))
+
+    # equation of time in minutes
+    y = np.tan(obliquity / 2) ** 2
+    eot = 4 * np.degrees(y * np.sin(2 * L0)
+                         - 2 * e * np.sin(M)
+                         + 4 * e * y * np.sin(M) * np.cos(2 * L0)
+                         - 0.5 * y * y * np.sin(4 * L0)
+                         - 1.25 * e * e * np.sin(2 * M))
+
+    minutes = (seconds % 86400.0) / 60.0
+    true_solar_time = (minutes + eot + 4 * longitude) % 1440
+    hour_angle = np.radians(true_solar_time / 4 - 180)
+
+    lat = np.radians(latitude)
+    altitude = np.arcsin(np.clip(
+        np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle), -1, 1))
+    azimuth = np.arctan2(np.sin(hour_angle),
+                         np.cos(hour_angle) * np.sin(lat) - np.tan(declination) * np.cos(lat))
+
+    return (np.degrees(azimuth) + 180) % 360, np.degrees(altitude)
+
+
+def iter_sun_vectors(latitude, longitude, start, end, step=datetime.timedelta(minutes=10),
+                     utc_offset=0, min_altitude=0, chunk_size=1024):
+    """
+    Yields light vectors and their time weights for the sun above the horizon between start and end
+
+    Each time step is sampled at its midpoint. Sun positions are computed chunk_size steps at a time,
+    so a year at 10 minute steps never has to be held in memory.
+
+    Parameters
+    ----------
+    latitude : latitude in degrees, north positive
+    longitude : longitude in degrees, east positive
+    start : datetime of the start of the period, local time
+    end : datetime of the end of the period, local time
+    step : timedelta between two samples
+    utc_offset : offset of the local time to UTC in hours
+    min_altitude : samples with the sun lower than this altitude in degrees are skipped
+    chunk_size : number of time steps computed at once
+
+    Yields
+    ------
+    vec : numpy array (3,) light direction (from the sun into the scene), x east, y north, z up
+    weight : duration represented by the sample in hours
+    """
+    start = _to_datetime64(start)
+    end = _to_datetime64(end)
+    step = np.timedelta64(step, 's')
+    if step <= np.timedelta64(0, 's'):
+        raise Exception('step has to be positive!!')
+    weight = step.astype(np.float64) / 3600.0
+
+    n_steps = int(np.ceil((end - start) / step))
+    for i in range(0, n_steps, chunk_size):
+        index = np.arange(i, min(i + chunk_size, n_steps))
+        times = start + index * step + step // 2
+        azimuth, altitude = sun_position(latitude, longitude, times, utc_offset)
+
+        above = altitude > min_altitude
+        azimuth = np.radians(azimuth[above])
+        altitude = np.radians(altitude[above])
+        vectors = -np.stack([np.sin(azimuth) * np.cos(altitude),
+                             np.cos(azimuth) * np.cos(altitude),
+                             np.sin(altitude)], axis=1)
+        for vec in vectors:
+            yield vec, weight
+
+
+def sun_vectors(latitude, longitude, start, end, step=datetime.timedelta(minutes=10),
+                utc_offset=0, min_altitude=0):
+    """
+    Light vectors and their time weights for the sun above the horizon between start and end
+
+    Returns
+    -------
+    vectors : numpy array (n, 3) of light directions, x east, y north, z up
+    weights : numpy array (n,) duration represented by each vector in hours
+    """
+    vectors = []
+    weights = []
+    for vec, weight in iter_sun_vectors(latitude, longitude, start, end, step, utc_offset, min_altitude):
+        vectors.append(vec)
+        weights.append(weight)
+    return np.reshape(vectors, (-1, 3)), np.array(weights, dtype=np.float64)
@@ -0,0 +1,185 @@
+import numpy as np
+from ._jit import jit
+
+
+__all__ = ['traverse_rays']
+
+
+@jit(nopython=True)
+def _voxel_step(v):
+    """ step direction, distance between two cell boundaries and distance to the first
+    boundary along the ray, starting from a cell centre """
+    if v > 0:
+        return 1, 1.0 / v, 0.5 / v
+    elif v < 0:
+        return -1, -1.0 / v, -0.5 / v
+    return 0, np.inf, np.inf
+
+
+@jit(nopython=True)
+def _ray2D(blocked, use_blocked, x0, y0, vx, vy, length, radius_sq, include_origin, visited, hits):
+    """ walk a single ray through a 2D grid, returns the number of newly visited cells """
+    nx, ny = visited.shape
+    step_x, delta_x, t_x = _voxel_step(vx)
+    step_y, delta_y, t_y = _voxel_step(vy)
+    moving = step_x != 0 or step_y != 0
+
+    count = 0
+    x, y = x0, y0
+    first = True
+    while True:
+        if not first:
+            # step into the next cell crossed by the ray
+            if t_x < t_y:
+                if t_x > length:
+                    break
+                x += step_x
+                t_x += delta_x
+            else:
+                if t_y > length:
+                    break
+                y += step_y
+                t_y += delta_y
+
+        if x < 0 or y < 0 or x >= nx or y >= ny:
+            break
+        if (x - x0) ** 2 + (y - y0) ** 2 >= radius_sq:
+            break
+        if use_blocked and not first and blocked[x, y]:
+            hits[x, y] = True
+            break
+        if (include_origin or not first) and not visited[x, y]:
+            visited[x, y] = True
+            count += 1
+        if not moving:
+            break
+        first = False
+    return count
+
+
+@jit(nopython=True)
+def _traverse2D(blocked, use_blocked, origins, directions, lengths, radius_sq, include_origin, visited, hits):
+    for i in range(origins.shape[0]):
+        _ray2D(blocked, use_blocked, origins[i, 0], origins[i, 1], directions[i, 0], directions[i, 1],
+               lengths[i], radius_sq, include_origin, visited, hits)
+
+
+@jit(nopython=True)
+def _ray3D(blocked, use_blocked, x0, y0, z0, vx, vy, vz, length, radius_sq, include_origin, visited, hits):
+    """ walk a single ray through a 3D grid, returns the number of newly visited voxels.
+    hits can be None if the blocked voxels stopping the ray are not needed """
+    nx, ny, nz = visited.shape
+    step_x, delta_x, t_x = _voxel_step(vx)
+    step_y, delta_y, t_y = _voxel_step(vy)
+    step_z, delta_z, t_z = _voxel_step(vz)
+    moving = step_x != 0 or step_y != 0 or step_z != 0
+
+    count = 0
+    x, y, z = x0, y0, z0
+    first = True
+    while True:
+        if not first:
+            # step into the next voxel crossed by the ray
+            if t_x < t_y and t_x < t_z:
+                if t_x > length:
+                    break
+                x += step_x
+                t_x += delta_x
+            elif t_y < t_z:
+                if t_y > length:
+                    break
+                y += step_y
+                t_y += delta_y
+            else:
+                if t_z > length:
+                    break
+                z += step_z
+                t_z += delta_z
+
+        if x < 0 or y < 0 or z < 0 or x >= nx or y >= ny or z >= nz:
+            break
+        if (x - x0) ** 2 + (y - y0) ** 2 + (z - z0) ** 2 >= radius_sq:
+            break
+        if use_blocked and not first and blocked[x, y, z]:
+            if hits is not None:
+                hits[x, y, z] = True
+            break
+        if (include_origin or not first) and not visited[x, y, z]:
+            visited[x, y, z] = True
+            count += 1
+        if not moving:
+            break
+        first = False
+    return count
+
+
+@jit(nopython=True)
+def _traverse3D(blocked, use_blocked, origins, directions, lengths, radius_sq, include_origin, visited, hits):
+    for i in range(origins.shape[0]):
+        _ray3D(blocked, use_blocked, origins[i, 0], origins[i, 1], origins[i, 2],
+               directions[i, 0], directions[i, 1], directions[i, 2],
+               lengths[i], radius_sq, include_origin, visited, hits)
+
+
+def traverse_rays(blocked, origins, directions, lengths=None, radius=None, include_origin=True,
+                  visited=None, hits=None):
+    """
+    Amanatides-Woo traversal of a batch of rays through a 2D or 3D grid
+
+    Every ray starts at the centre of its origin cell and visits every cell it passes through,
+    so rays cannot slip through diagonal gaps between two blocked cells.
+    The origin cell never stops its own rays, so rays can also be cast from blocked cells.
+    A ray stops in front of the first blocked cell, when it leaves the grid,
+    when it reaches the end of its length or when a cell centre is radius or more away from the origin.
+
+    Parameters
+    ----------
+    blocked : 2D or 3D boolean numpy array, True for cells that stop the rays.
+              None to never stop, visited has to be given then
+    origins : (n, ndim) integer numpy array with the cell index of each ray's origin
+    directions : (n, ndim) float numpy array with the direction of each ray, in array axis order
+    lengths : (n,) float numpy array, rays stop at origin + lengths * directions. None for unlimited rays
+    radius : float, maximum distance of visited cell centres from the origin. None for unlimited
+    include_origin : Boolean to mark the origin cell as visited
+    visited : boolean numpy array to be updated, a new one is created if None
+    hits : boolean numpy array to be updated, a new one is created if None
+
+    Returns
+    -------
+    visited : boolean numpy array with True for cells crossed by a ray
+    hits : boolean numpy array with True for blocked cells that stopped a ray
+    """
+    if blocked is None:
+        if visited is None:
+            raise Exception('visited has to be given if blocked is None!!')
+        shape = visited.shape
+        use_blocked = False
+        blocked = np.zeros((1,) * len(shape), dtype=np.bool_)
+    else:
+        shape = blocked.shape
+        use_blocked = True
+        blocked = np.asarray(blocked, dtype=np.bool_)
+
+    ndim = len(shape)
+    if ndim > 3 or ndim < 2:
+        raise Exception('array has to be 2D or 3D!!')
+
+    origins = np.ascontiguousarray(np.reshape(origins, (-1, ndim)), dtype=np.int64)
+    directions = np.ascontiguousarray(np.reshape(directions, (-1, ndim)), dtype=np.float64)
+    if lengths is None:
+        lengths = np.full(origins.shape[0], np.inf)
+    else:
+        lengths = np.ascontiguousarray(np.broadcast_to(lengths, origins.shape[:1]), dtype=np.float64)
+    radius_sq = np.inf if radius is None else float(radius) ** 2
+
+    if visited is None:
+        visited = np.zeros(shape, dtype=np.bool_)
+    if hits is None:
+        hits = np.zeros(shape, dtype=np.bool_)
+
+    if ndim == 2:
+        _traverse2D(blocked, use_blocked, origins, directions, lengths, radius_sq, include_origin, visited, hits)
+    else:
+        _traverse3D(blocked, use_blocked, origins, directions, lengths, radius_sq, include_origin, visited, hits)
+
+    return visited, hits
@@ -0,0 +1,65 @@
+import numpy as np
+from ._jit import _registry
+from .grid import to_obstacle_map
+from .isovist import Isovist
+from .shortest_path import Shortestpath
+from .isovist3D import isovist_from_point3D
+from .isovist3D import isovist_count_map3D
+from .shadow import shadow_from_sun_ray
+from .shadow import analyse_shadow_traversal
+from .shadow_Bresenham import analyse_shadow_Bresenham_sorted
+from .exposure import facade_exposure
+from .components import label_components
+from .hierarchical import HierarchicalPath
+from .geodesic import geodesic_distance
+from .geodesic import any_angle_path
+
+
+__all__ = ['warmup']
+
+
+WARMUP_DTYPES = (np.int8, np.bool_, np.int64)
+
+
+def warmup(dtypes=WARMUP_DTYPES):
+    """
+    Compiles the numba kernels ahead of the first real call by running every analysis using them
+    on tiny arrays of the given dtypes with float64 light vectors.
+    The compiled kernels are kept in the on-disk cache, so later processes load instead of compiling them,
+    e.g. call warmup() in the initializer of a process pool or run python -m grid_analytics.tools in a container build.
+
+    Parameters
+    ----------
+    dtypes : dtypes of the voxel arrays to compile for
+
+    Returns
+    -------
+    dict {kernel name: amount of compiled signatures}. Helper kernels only called by other kernels
+    (e.g. _line_of_sight) show 0 when their callers were loaded from the on-disk cache, they are part of them
+    """
+    light = np.array([1.0, 0.5, -1.0])
+    for dtype in dtypes:
+        plan = np.zeros((4, 4), dtype=dtype)
+        plan[1, 1] = 1
+        volume = np.zeros((4, 4, 4), dtype=dtype)
+        volume[1, 1, 1] = 1
+
+        analyse_shadow_Bresenham_sorted(volume, light)
+        shadow_from_sun_ray(volume, light)
+        analyse_shadow_traversal(volume, light)
+        facade_exposure(volume, [light])
+
+        isovist = Isovist(to_obstacle_map(plan))
+        isovist.isovist_from_point((0, 0))
+        isovist.isovist_map()
+        isovist_from_point3D(volume, (0, 0, 0))
+        isovist_count_map3D(volume, [(0, 0, 0)], radius=2)
+        label_components(plan)
+        label_components(volume)
+        HierarchicalPath(plan, cluster_size=2).find_path(0, 15)
+        geodesic_distance(plan, (0, 0))
+        geodesic_distance(plan, (0, 0), method='any_angle')
+        any_angle_path(plan, (0, 0), (3, 3))
+        Shortestpath(to_obstacle_map(plan), cost_map=np.ones(plan.shape)).get_minimal_spanningtree(0)
+
+    return {kernel.__name__: len(kernel.dispatcher.signatures) for kernel in _registry}
@@ -1,6 +1,19 @@
-from .plt import *
+import importlib
 from .color_value import *
 from .utilities import *
+from .mesh import *
+from .image import *
 
 
-__all__ = [name for name in dir() if not name.startswith('_')]
\ No newline at end of file
+# matplotlib is imported on first use of the display functions
+_LAZY = {'display_array3D': '.plt',
+         'display_array2D': '.plt'}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+__all__ = [name for name in dir() if not name.startswith('_') and name != 'importlib'] + list(_LAZY)
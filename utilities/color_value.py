@@ -5,7 +5,10 @@ except ImportError:
 
 import colorsys
 
-__all__ = ['value_to_color']
+__all__ = ['value_to_color',
+           'hue_lut',
+           'colormap_lut',
+           'apply_lut']
 
 
 def math_map(value, fromMin, fromMax, toMin, toMax):
@@ -33,17 +36,97 @@ def color_hue_to_rgb(hue):
     return (col[0], col[1], col[2], 1)  # alpha = 100 %
 
 
-def value_to_color(value_array, min_value, max_value, min_hue, max_hue):
-    ndim = value_array.ndim
-    new_shape = []
-    for i in range(ndim):
-        new_shape.append(value_array.shape[i])
-    new_shape.append(4)
-    new_shape = tuple(new_shape)
-    color_array = np.empty((new_shape))
-    with np.nditer(value_array, flags=['multi_index']) as it:
-        for x in it:
-            hue = math_map(
-                x, min_value, max_value, min_hue, max_hue)
-            color_array[it.multi_index] = color_hue_to_rgb(hue)
-    return color_array
\ No newline at end of file
+def hue_to_rgba(hue, dtype=np.float64):
+    """
+    Vectorized color_hue_to_rgb: converts an array of hues (HSV, saturation and value 100%)
+    into an array of shape (*hue.shape, 4) with red, green, blue and alpha = 1
+    """
+    hue = np.asarray(hue, dtype=np.float64)
+    sector = np.trunc(hue * 6.0)
+    f = hue * 6.0 - sector
+    sector = sector.astype(np.int64) % 6
+    q = 1.0 - f
+
+    one = np.ones_like(hue)
+    zero = np.zeros_like(hue)
+    # (r, g, b) of the 6 sectors of the hue circle as in colorsys.hsv_to_rgb
+    r = np.choose(sector, [one, q, zero, zero, f, one])
+    g = np.choose(sector, [f, one, one, q, zero, zero])
+    b = np.choose(sector, [zero, zero, f, one, one, q])
+
+    rgba = np.stack([r, g, b, one], axis=-1)
+    if np.dtype(dtype) == np.uint8:
+        return np.rint(rgba * 255).astype(np.uint8)
+    return rgba.astype(dtype, copy=False)
+
+
+def hue_lut(min_hue, max_hue, size=256, dtype=np.float32):
+    """
+    Precomputed RGBA lookup table of shape (size, 4) for a linear hue ramp from min_hue to max_hue
+    """
+    return hue_to_rgba(np.linspace(min_hue, max_hue, size), dtype)
+
+
+def colormap_lut(cmap, size=256, dtype=np.float32):
+    """
+    Precomputed RGBA lookup table of shape (size, 4) sampled from a matplotlib colormap (name or Colormap)
+    """
+    import matplotlib
+    if isinstance(cmap, str):
+        cmap = matplotlib.colormaps[cmap]
+    rgba = cmap(np.linspace(0, 1, size))
+    if np.dtype(dtype) == np.uint8:
+        return np.rint(rgba * 255).astype(np.uint8)
+    return rgba.astype(dtype)
+
+
+def apply_lut(value_array, lut, min_value, max_value):
+    """
+    Maps every value of an array through a RGBA lookup table in one pass.
+    Values are normalised from [min_value, max_value] to the entries of the table and clipped.
+
+    Returns
+    -------
+    color_array : numpy array of shape (*value_array.shape, 4) with the dtype of the lookup table
+    """
+    size = lut.shape[0]
+    delta = max_value - min_value
+    if delta == 0:
+        index = np.zeros(np.shape(value_array), dtype=np.intp)
+    else:
+        index = np.asarray(value_array, dtype=np.float32) - min_value
+        index *= (size - 1) / delta
+        np.clip(index, 0, size - 1, out=index)
+        index = np.rint(index, out=index).astype(np.int32)
+    return lut[index]
+
+
+def value_to_color(value_array, min_value, max_value, min_hue, max_hue, lut_size=None, dtype=np.float32):
+    """
+    Maps the values of an array to colors of a hue ramp.
+    Values outside of [min_value, max_value] are clipped to the colors of min_hue and max_hue,
+    with and without lookup table.
+
+    Parameters
+    ----------
+    value_array : numpy array of values
+    min_value, max_value : range of the values
+    min_hue, max_hue : hues (0 to 1) the range of values is mapped to
+    lut_size : None to compute the color of every value exactly,
+               or the size of a lookup table (e.g. 256 or 4096) for faster mapping
+    dtype : dtype of the colors, np.float32, np.float64 or np.uint8 (0 to 255)
+
+    Returns
+    -------
+    color_array : numpy array of shape (*value_array.shape, 4) with RGBA colors
+    """
+    if lut_size is not None:
+        return apply_lut(value_array, hue_lut(min_hue, max_hue, lut_size, dtype), min_value, max_value)
+
+    delta = max_value - min_value
+    if delta == 0:
+        hue = np.full(np.shape(value_array), float(min_hue))
+    else:
+        t = np.clip((np.asarray(value_array, dtype=np.float64) - min_value) / delta, 0, 1)
+        hue = min_hue + (max_hue - min_hue) * t
+    return hue_to_rgba(hue, dtype)
@@ -0,0 +1,70 @@
+import struct
+import zlib
+import numpy as np
+from .color_value import apply_lut
+from .color_value import colormap_lut
+
+
+__all__ = ['write_png', 'save_array_png']
+
+
+def _png_chunk(tag, data):
+    chunk = tag + data
+    return struct.pack('>I', len(data)) + chunk + struct.pack('>I', zlib.crc32(chunk) & 0xffffffff)
+
+
+def write_png(rgba, path, compression=1):
+    """
+    Writes an image to a PNG file without matplotlib
+
+    Parameters
+    ----------
+    rgba : uint8 numpy array of shape (height, width, 4) (RGBA) or (height, width, 3) (RGB)
+    path : path of the file to write
+    compression : zlib compression level from 0 to 9
+    """
+    rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+    height, width, channels = rgba.shape
+    color_type = {3: 2, 4: 6}[channels]
+
+    # every scanline starts with filter type 0 (none)
+    raw = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, -1)
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)))
+        f.write(_png_chunk(b'IDAT', zlib.compress(raw.tobytes(), compression)))
+        f.write(_png_chunk(b'IEND', b''))
+
+
+def save_array_png(data, path, col='binary', vmin=None, vmax=None, scale=1, origin='lower', compression=1):
+    """
+    Writes a 2D numpy array as a PNG image, one pixel (or scale x scale pixels) per cell, without a figure
+
+    Parameters
+    ----------
+    data : 2D numpy array
+    path : path of the file to write
+    col : Matplotlib color map name, or a RGBA lookup table (e.g. from hue_lut or colormap_lut)
+    vmin, vmax : range of values mapped to the color map, defaults to the range of data
+    scale : integer upscaling of every cell
+    origin : 'lower' puts the first row at the bottom like display_array2D, 'upper' at the top
+    compression : zlib compression level from 0 to 9
+    """
+    if data.ndim != 2:
+        raise Exception('array has to be 2D!!')
+
+    lut = colormap_lut(col, 256, np.uint8) if isinstance(col, str) else np.asarray(col)
+    if lut.dtype != np.uint8:
+        lut = np.rint(np.clip(lut, 0, 1) * 255).astype(np.uint8)
+
+    vmin = np.min(data) if vmin is None else vmin
+    vmax = np.max(data) if vmax is None else vmax
+    rgba = apply_lut(data, lut, vmin, vmax)
+
+    if origin == 'lower':
+        rgba = rgba[::-1]
+    if scale > 1:
+        rgba = np.repeat(np.repeat(rgba, scale, axis=0), scale, axis=1)
+    write_png(rgba, path, compression)
@@ -0,0 +1,125 @@
+import numpy as np
+from ..tools.neighbors import facade_bitmask
+
+
+__all__ = ['exposed_face_quads', 'export_mesh']
+
+
+# corners of the 6 voxel faces in the order of the facade_bitmask bits (-x, +x, -y, +y, -z, +z),
+# counter clockwise seen from outside
+_FACE_CORNERS = np.array([
+    [(0, 0, 0), (0, 0, 1), (0, 1, 1), (0, 1, 0)],
+    [(1, 0, 0), (1, 1, 0), (1, 1, 1), (1, 0, 1)],
+    [(0, 0, 0), (1, 0, 0), (1, 0, 1), (0, 0, 1)],
+    [(0, 1, 0), (0, 1, 1), (1, 1, 1), (1, 1, 0)],
+    [(0, 0, 0), (0, 1, 0), (1, 1, 0), (1, 0, 0)],
+    [(0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+], dtype=np.float32)
+
+
+def _as_3D(array):
+    if array.ndim == 2:
+        return array[:, :, np.newaxis]
+    elif array.ndim == 3:
+        return array
+    raise Exception('array has to be 2D or 3D!!')
+
+
+def exposed_face_quads(array, colors=None):
+    """
+    Quads of all exposed faces of the solid voxels of a 2D or 3D array.
+    Voxel (x, y, z) spans from (x, y, z) to (x+1, y+1, z+1).
+
+    Parameters
+    ----------
+    array : 2D or 3D numpy array with 0 for void and 1 for solid voxels
+    colors : optional numpy array of shape (*array.shape, 4) with a RGBA color per voxel
+
+    Returns
+    -------
+    vertices : float32 numpy array (n * 4, 3), 4 vertices per quad
+    quads : int32 numpy array (n, 4) with the vertex indices of each quad
+    quad_colors : numpy array (n, 4) with the color of each quad, only returned if colors is given
+    """
+    if array.ndim == 2 and colors is not None:
+        colors = colors[:, :, np.newaxis]
+    array = _as_3D(array)
+    bitmask = facade_bitmask(array)
+
+    vertices = []
+    quad_colors = []
+    for face in range(6):
+        cells = np.argwhere(bitmask & (1 << face))
+        vertices.append((cells[:, np.newaxis, :] + _FACE_CORNERS[face]).reshape(-1, 3).astype(np.float32))
+        if colors is not None:
+            quad_colors.append(colors[tuple(cells.T)])
+
+    vertices = np.concatenate(vertices)
+    quads = np.arange(vertices.shape[0], dtype=np.int32).reshape(-1, 4)
+    if colors is None:
+        return vertices, quads
+    return vertices, quads, np.concatenate(quad_colors)
+
+
+def export_mesh(array, path, colors=None):
+    """
+    Writes the exposed faces of the solid voxels of a 2D or 3D array as a mesh.
+    The format follows the file extension: '.ply' (binary little endian) or '.obj' (text, no colors)
+
+    Parameters
+    ----------
+    array : 2D or 3D numpy array with 0 for void and 1 for solid voxels
+    path : path of the file to write
+    colors : optional numpy array of shape (*array.shape, 4) with a RGBA color per voxel
+             (floats from 0 to 1 or uint8), written as face colors to PLY files
+    """
+    path = str(path)
+    if path.lower().endswith('.ply'):
+        _export_ply(array, path, colors)
+    elif path.lower().endswith('.obj'):
+        _export_obj(array, path)
+    else:
+        raise Exception('mesh format has to be .ply or .obj!!')
+
+
+def _export_ply(array, path, colors=None):
+    if colors is None:
+        vertices, quads = exposed_face_quads(array)
+    else:
+        vertices, quads, quad_colors = exposed_face_quads(array, colors)
+        if quad_colors.dtype != np.uint8:
+            quad_colors = np.rint(np.clip(quad_colors, 0, 1) * 255).astype(np.uint8)
+
+    header = ['ply',
+              'format binary_little_endian 1.0',
+              'element vertex %d' % vertices.shape[0],
+              'property float x',
+              'property float y',
+              'property float z',
+              'element face %d' % quads.shape[0],
+              'property list uchar int vertex_indices']
+    face_dtype = [('count', 'u1'), ('indices', '<i4', (4,))]
+    if colors is not None:
+        header += ['property uchar red', 'property uchar green', 'property uchar blue', 'property uchar alpha']
+        face_dtype.append(('color', 'u1', (4,)))
+    header.append('end_header')
+
+    faces = np.empty(quads.shape[0], dtype=face_dtype)
+    faces['count'] = 4
+    faces['indices'] = quads
+    if colors is not None:
+        faces['color'] = quad_colors
+
+    with open(path, 'wb') as f:
+        f.write(('\n'.join(header) + '\n').encode('ascii'))
+        f.write(vertices.astype('<f4').tobytes())
+        f.write(faces.tobytes())
+
+
+def _export_obj(array, path):
+    vertices, quads = exposed_face_quads(array)
+    with open(path, 'w') as f:
+        f.write('# %d vertices, %d faces\n' % (vertices.shape[0], quads.shape[0]))
+        np.savetxt(f, vertices, fmt='v %g %g %g')
+        # obj indices start at 1
+        np.savetxt(f, quads + 1, fmt='f %d %d %d %d')
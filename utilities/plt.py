@@ -1,23 +1,81 @@
+import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+from .mesh import exposed_face_quads
+from .utilities import block_max_pool
 
 
 __all__ = ['display_array3D', 'display_array2D']
 
 
-def display_array3D(voxel_bools, voxel_colors='w', edge_color='k', width=6, height=6, nX=16, nY=16, nZ=16, show_axis=False):
+def _block_max_colors(voxel_bools, voxel_colors, factor):
+    """ color of the voxel winning the maximum of every block of block_max_pool """
+    voxel_bools = np.asarray(voxel_bools)
+    pad = [(0, -n % factor) for n in voxel_bools.shape]
+    padded = np.pad(voxel_bools, pad, mode='constant', constant_values=voxel_bools.min())
+    n_blocks = [n // factor for n in padded.shape]
+    blocks = padded.reshape(n_blocks[0], factor, n_blocks[1], factor, n_blocks[2], factor)
+    blocks = blocks.transpose(0, 2, 4, 1, 3, 5).reshape(*n_blocks, -1)
+    # argmax takes the first maximum and the first voxel of a block is never padding
+    offsets = np.unravel_index(blocks.argmax(axis=-1), (factor,) * 3)
+    indices = np.indices(n_blocks) * factor + np.array(offsets)
+    indices = np.minimum(indices, np.reshape(voxel_bools.shape, (3, 1, 1, 1)) - 1)
+    return np.asarray(voxel_colors)[tuple(indices)]
+
+
+def display_array3D(voxel_bools, voxel_colors='w', edge_color='k', width=6, height=6, nX=16, nY=16, nZ=16, show_axis=False,
+                    mode='voxels', downsample=None):
+    """
+    Display a 3D numpy array using matplotlib
+    
+    Parameters
+    ----------
+    voxel_bools : 3D numpy array with True or >0 for solid voxels
+    voxel_colors : Matplotlib color, or numpy array of shape (*voxel_bools.shape, 4) with a RGBA color per voxel
+    edge_color : Matplotlib color of the edges, None for no edges
+    width, height : size of the figure
+    nX, nY, nZ : size of the displayed space
+    show_axis : Boolean to display the axis
+    mode : 'voxels' draws every voxel with ax.voxels,
+           'faces' only draws the exposed faces of the surface voxels as one polygon collection,
+           which is much faster for large volumes
+    downsample : None, or an int factor to reduce the volume by block max pooling before drawing
+    
+    Returns
+    -------
+    Plot a 3D numpy array using matplotlib
+    """
+    if downsample is not None and downsample > 1:
+        if np.ndim(voxel_colors) == 4:
+            voxel_colors = _block_max_colors(voxel_bools, voxel_colors, downsample)
+        voxel_bools = block_max_pool(voxel_bools, downsample)
+        nX, nY, nZ = [int(np.ceil(n / downsample)) for n in (nX, nY, nZ)]
+
     fig = plt.figure(figsize=(width,height)) # initialize figure dimensions
-    ax = Axes3D(fig)
+    ax = fig.add_subplot(projection='3d')
     nMax = max([nX,nY,nZ]) # get max dimension of the three
     ax.cla() # clear axes
-    ax.voxels(voxel_bools, facecolors=voxel_colors, edgecolor=edge_color) # draw voxels with defined faces and edges colors
+    if mode == 'voxels':
+        ax.voxels(voxel_bools, facecolors=voxel_colors, edgecolor=edge_color) # draw voxels with defined faces and edges colors
+    elif mode == 'faces':
+        if isinstance(voxel_colors, str):
+            vertices, quads = exposed_face_quads(voxel_bools)
+            face_colors = voxel_colors
+        else:
+            vertices, quads, face_colors = exposed_face_quads(voxel_bools, voxel_colors)
+            if face_colors.dtype == np.uint8:
+                face_colors = face_colors / 255
+        ax.add_collection3d(Poly3DCollection(vertices[quads], facecolors=face_colors, edgecolors=edge_color))
+    else:
+        raise Exception('mode has to be voxels or faces!!')
     if not show_axis:
         ax.set_axis_off() # turn off axis
     ax.auto_scale_xyz([0, nMax], [0, nMax], [0, nMax]) # scale based on max dimension
     plt.show()
 
 
-def display_array2D(data, height, col='binary', edgecol='w'):
+def display_array2D(data, height, col='binary', edgecol='w', mode='pcolor', grid_threshold=100):
     """
     Display a 2D numpy array using matplotlib
     
@@ -27,13 +85,26 @@ def display_array2D(data, height, col='binary', edgecol='w'):
     height : Height of the plot - Proportional length 
     col : Matplotlib color map for voxels - https://matplotlib.org/stable/gallery/color/colormap_reference.html
     edgecol : Matplotlib color palette for edges - https://matplotlib.org/stable/gallery/color/named_colors.html
+    mode : 'pcolor' draws a polygon per cell, 'image' draws a raster image with nearest neighbour sampling,
+           which is much faster for large arrays
+    grid_threshold : in 'image' mode, edges are only drawn if no side of data has more cells
     
     Returns
     -------
     Plot a 2D numpy array using matplotlib
     """
     plt.figure(figsize=(height * (data.shape[1] / data.shape[0]), height))
-    plt.pcolor(data,cmap=col,edgecolors=edgecol, linewidths=height * 0.08)
+    if mode == 'pcolor':
+        plt.pcolor(data,cmap=col,edgecolors=edgecol, linewidths=height * 0.08)
+    elif mode == 'image':
+        nY, nX = data.shape
+        plt.imshow(data, cmap=col, interpolation='nearest', origin='lower',
+                   extent=(0, nX, 0, nY), aspect='auto')
+        if edgecol is not None and max(data.shape) <= grid_threshold:
+            plt.vlines(np.arange(nX + 1), 0, nY, colors=edgecol, linewidths=height * 0.08)
+            plt.hlines(np.arange(nY + 1), 0, nX, colors=edgecol, linewidths=height * 0.08)
+    else:
+        raise Exception('mode has to be pcolor or image!!')
     plt.tight_layout()
     plt.axis('off')
-    plt.show()
\ No newline at end of file
+    plt.show()
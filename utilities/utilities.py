@@ -1,7 +1,8 @@
 import numpy as np
 
 
-__all__ = ['array_move']
+__all__ = ['array_move',
+           'block_max_pool']
 
 
 def array_move(array, vec):
@@ -20,4 +21,32 @@ def array_move(array, vec):
     for i in range(3):
         array = np.roll(array, vec[i], axis=i)
 
-    return array
\ No newline at end of file
+    return array
+
+def block_max_pool(array, factor):
+    """ downsample an array by taking the maximum of every block of factor cells per axis
+
+    Parameters
+    ----------
+    array: numpy ndarray
+        2D or 3D numpy array, the shape does not need to be a multiple of factor
+    factor: int
+        size of the blocks
+    
+    Returns
+    -------
+    numpy ndarray
+    """
+    factor = int(factor)
+    if factor <= 1:
+        return array
+
+    # pad to a multiple of factor with the smallest value so padding never wins the maximum
+    pad = [(0, -n % factor) for n in array.shape]
+    if any(p[1] for p in pad):
+        array = np.pad(array, pad, mode='constant', constant_values=array.min())
+
+    blocks = []
+    for n in array.shape:
+        blocks.extend([n // factor, factor])
+    return array.reshape(blocks).max(axis=tuple(range(1, 2 * array.ndim, 2)))